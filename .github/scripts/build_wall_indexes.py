@@ -0,0 +1,29 @@
+import os
+import sys
+
+# Add .github/scripts to sys.path to find the index modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from duplicate_index import DuplicateIndex
+from wall_index import messages_index, stories_index
+
+WALLS = [('MESSAGES.md', messages_index), ('STORIES.md', stories_index)]
+
+
+def main():
+    '''
+    Build (or bring up to date) the WallIndex and DuplicateIndex of every wall
+    file on the default branch. The workflow saves them to a cache that pull
+    request runs restore, so a PR only indexes and signs the entries it adds
+    instead of the whole wall.
+    '''
+    for path, open_index in WALLS:
+        if not os.path.exists(path):
+            print(f"{path} not found; nothing to index.")
+            continue
+        wall = open_index(path)
+        duplicates = DuplicateIndex(wall)
+        print(f"Indexed {len(wall.entries)} entries of {path} ({len(duplicates.entries)} distinct).")
+
+
+if __name__ == '__main__':
+    main()
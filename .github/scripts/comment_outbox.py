@@ -0,0 +1,184 @@
+import json
+import os
+import sys
+import time
+from collections import deque
+from pathlib import Path
+
+from github.GithubException import GithubException
+
+DEFAULT_OUTBOX_PATH = '.github/cache/comment_outbox.json'
+MAX_COMMENT_LENGTH = 65536  # GitHub rejects issue comment bodies longer than this
+ENTRY_SEPARATOR = '\n\n'
+
+# GitHub's secondary rate limits for content creation: at most one write per
+# second and roughly 80 per minute / 500 per hour.
+SECONDS_BETWEEN_WRITES = 1.0
+WRITE_BUDGETS = [(60, 80), (3600, 500)]
+MAX_ATTEMPTS = 5
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)  # plus 403s that are rate limits, see _retry_delay
+
+
+def split_body(body: str) -> list:
+    '''
+    Split ``body`` into parts of at most MAX_COMMENT_LENGTH characters,
+    breaking at the last line break of each part where there is one.
+    '''
+    parts = []
+    while len(body) > MAX_COMMENT_LENGTH:
+        cut = body.rfind('\n', 0, MAX_COMMENT_LENGTH + 1)
+        if cut <= 0:
+            cut = MAX_COMMENT_LENGTH
+        parts.append(body[:cut])
+        body = body[cut:].lstrip('\n')
+    return parts + [body] if body or not parts else parts
+
+
+def _retry_delay(e: GithubException, attempt: int):
+    '''
+    Seconds to wait before retrying after ``e``, or None if it is not worth retrying.
+
+    A 403 is only retried when it is a rate limit, i.e. carries Retry-After or
+    an exhausted X-RateLimit-Remaining; other 403s are permission errors.
+    '''
+    headers = {key.lower(): value for key, value in (e.headers or {}).items()}
+    retry_after = headers.get('retry-after')
+    if retry_after:
+        return float(retry_after)
+    if e.status == 403:
+        if headers.get('x-ratelimit-remaining') != '0':
+            return None
+        reset = headers.get('x-ratelimit-reset')
+        return max(float(reset) - time.time(), 1.0) if reset else 2 ** attempt * 5
+    return 2 ** attempt * 5 if e.status in RETRYABLE_STATUSES else None
+
+
+class CommentOutbox:
+    '''
+    Queues issue comments, coalesces them and posts them with pacing and retries.
+
+    Entries for the same issue are merged into as few comments as fit under
+    GitHub's body size limit; an entry over the limit is split across several
+    comments. Anything that still fails is kept in a local JSON outbox and
+    replayed by the next flush() that finds the file.
+
+    In the workflows the outbox lives in .github/cache, restored by
+    actions/cache. Caches saved by a pull_request run are scoped to that PR,
+    so entries a community PR fails to post are only replayed when that
+    same PR's workflow runs again (a re-run or a new push), not by runs on
+    other branches.
+
+    Args:
+        repo: PyGithub Repository the issues belong to.
+        path (str): Location of the durable outbox file.
+    '''
+
+    def __init__(self, repo, path: str = DEFAULT_OUTBOX_PATH):
+        self.repo = repo
+        self.path = Path(path)
+        self._queue = []
+        self._issues = {}
+        self._recent_writes = deque()
+        self._last_write = 0.0
+
+    def add(self, issue, body: str):
+        '''Queue ``body`` for ``issue`` (an Issue object or an issue number).'''
+        number = issue if isinstance(issue, int) else issue.number
+        if not isinstance(issue, int):
+            self._issues[number] = issue
+        self._queue.append({'issue': number, 'body': body})
+
+    def flush(self) -> int:
+        '''Post every pending entry, including ones left over from earlier runs. Returns comments posted.'''
+        pending = [{'issue': entry['issue'], 'body': part}
+                   for entry in self._load() + self._queue for part in split_body(entry['body'])]
+        self._queue = []
+        if not pending:
+            return 0
+        # Persist first, so a crash mid-flush still leaves everything replayable
+        self._save(pending)
+
+        failed, posted = [], 0
+        for number, batch in self._coalesce(pending):
+            body = ENTRY_SEPARATOR.join(entry['body'] for entry in batch)
+            if self._post(number, body):
+                posted += 1
+            else:
+                failed.extend(batch)
+        self._save(failed)
+        if failed:
+            print(f"{len(failed)} comment(s) kept in {self.path} for the next run that restores it.",
+                  file=sys.stderr)
+        return posted
+
+    def _coalesce(self, entries):
+        by_issue = {}
+        for entry in entries:
+            by_issue.setdefault(entry['issue'], []).append(entry)
+        for number, issue_entries in by_issue.items():
+            batch, size = [], 0
+            for entry in issue_entries:
+                entry_size = len(entry['body']) + (len(ENTRY_SEPARATOR) if batch else 0)
+                if batch and size + entry_size > MAX_COMMENT_LENGTH:
+                    yield number, batch
+                    batch, size = [], 0
+                    entry_size = len(entry['body'])
+                batch.append(entry)
+                size += entry_size
+            if batch:
+                yield number, batch
+
+    def _post(self, number: int, body: str) -> bool:
+        for attempt in range(MAX_ATTEMPTS):
+            self._pace()
+            try:
+                issue = self._issues.get(number) or self.repo.get_issue(number=number)
+                self._issues[number] = issue
+                issue.create_comment(body)
+                print(f"Posted comment to issue #{number}")
+                return True
+            except GithubException as e:
+                delay = _retry_delay(e, attempt)
+                if delay is None or attempt == MAX_ATTEMPTS - 1:
+                    print(f"Error posting comment to issue #{number}: {e}", file=sys.stderr)
+                    return False
+                print(f"Posting to issue #{number} failed with {e.status}, retrying in {delay:.0f}s", file=sys.stderr)
+                time.sleep(delay)
+            except Exception as e:
+                print(f"Error posting comment to issue #{number}: {e}", file=sys.stderr)
+                return False
+        return False
+
+    def _pace(self):
+        now = time.time()
+        while self._recent_writes and self._recent_writes[0] <= now - WRITE_BUDGETS[-1][0]:
+            self._recent_writes.popleft()
+        wait = self._last_write + SECONDS_BETWEEN_WRITES - now
+        for window, budget in WRITE_BUDGETS:
+            in_window = [t for t in self._recent_writes if t > now - window]
+            if len(in_window) >= budget:
+                wait = max(wait, in_window[0] + window - now)
+        if wait > 0:
+            time.sleep(wait)
+        self._last_write = time.time()
+        self._recent_writes.append(self._last_write)
+
+    def _load(self):
+        if not self.path.exists():
+            return []
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable comment outbox {self.path}: {e}", file=sys.stderr)
+            return []
+
+    def _save(self, entries):
+        if not entries:
+            self.path.unlink(missing_ok=True)
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f)
+        os.replace(tmp_path, self.path)
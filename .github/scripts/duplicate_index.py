@@ -0,0 +1,167 @@
+import hashlib
+import json
+import os
+import random
+import re
+from collections import Counter
+from pathlib import Path
+
+from wall_index import INDEX_DIR
+
+SHINGLE_WIDTH = 5                # characters per shingle
+NUM_HASHES = 32                  # MinHash signature length
+BANDS = 8                        # LSH bands of NUM_HASHES // BANDS rows each
+NEAR_DUPLICATE_THRESHOLD = 0.8   # estimated Jaccard similarity that counts as a repeat
+
+# Multiply-shift hash functions: h -> high 32 bits of (a * h + b) mod 2**64, with odd a.
+# Seeded, so signatures persisted by earlier runs stay comparable.
+_MASK64 = (1 << 64) - 1
+_rng = random.Random(1000000000)
+_PERMUTATIONS = [(_rng.getrandbits(64) | 1, _rng.getrandbits(64)) for _ in range(NUM_HASHES)]
+
+MENTION = re.compile(r'@[\w-]+')
+NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize(text: str) -> str:
+    '''Lowercased words only: markdown, punctuation and @mentions do not make a text new.'''
+    return NON_WORD.sub(' ', MENTION.sub(' ', text.lower())).strip()
+
+
+def content_hash(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def signature(normalized: str) -> list:
+    '''
+    MinHash signature of the text's character shingles. Each shingle is
+    hashed once; the NUM_HASHES permutations are multiply-shift maps of that
+    hash, and the fraction of positions two signatures share estimates the
+    Jaccard similarity of their shingle sets.
+    '''
+    width = min(SHINGLE_WIDTH, len(normalized))
+    hashes = {int.from_bytes(hashlib.blake2b(normalized[i:i + width].encode('utf-8'), digest_size=8).digest(), 'big')
+              for i in range(len(normalized) - width + 1)}
+    # The minimum of the low 64 bits is ordered by their high 32 bits, the hash value itself
+    return [min([(a * h + b) & _MASK64 for h in hashes]) >> 32 for a, b in _PERMUTATIONS]
+
+
+def band_keys(sig: list) -> list:
+    rows = NUM_HASHES // BANDS
+    return [f"{band}:" + hashlib.sha1(repr(sig[band * rows:(band + 1) * rows]).encode('ascii')).hexdigest()[:16]
+            for band in range(BANDS)]
+
+
+def similarity(a: list, b: list) -> float:
+    return sum(x == y for x, y in zip(a, b)) / NUM_HASHES
+
+
+class DuplicateIndex:
+    '''
+    Exact and near-duplicate lookup over the entries of a wall file.
+
+    Every entry is keyed by the hash of its normalized text, which answers
+    exact repeats with one dict lookup; its MinHash signature is filed under
+    BANDS locality-sensitive bucket keys, so a near repeat is found by
+    comparing against the few entries sharing a bucket rather than the whole
+    wall. The index is persisted next to the wall's WallIndex and synced
+    against the wall's current entries on load. Nothing is read while the
+    wall file is unchanged; otherwise wall entries are told apart by their
+    WallIndex key and byte length, and only entries with a pair it has not
+    seen are read, hashed and signed. Rewriting a sorted wall keeps the key
+    and length of every entry it moves, so a change only costs reading the
+    entries it adds (and at most the previous last one, which gains padding).
+
+    Args:
+        wall (WallIndex): Index of the wall file to check against.
+    '''
+
+    def __init__(self, wall):
+        self.wall = wall
+        self.index_path = Path(INDEX_DIR) / f"{wall.path.name}.dups.json"
+        self.entries = {}       # content hash -> {"count", "signature", "preview"}
+        self.buckets = {}       # band key -> [content hash]
+        self.fingerprints = {}  # "<length>:<key>" of a wall entry -> its content hash, or None if empty
+        self.wall_sha1 = None   # WallIndex digest of the wall as last synced
+        self._load()
+        self._sync()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            self.entries, self.buckets = saved['entries'], saved['buckets']
+            self.fingerprints, self.wall_sha1 = saved['fingerprints'], saved['wall_sha1']
+        except (OSError, ValueError, KeyError):
+            self.entries, self.buckets, self.fingerprints, self.wall_sha1 = {}, {}, {}, None
+
+    def _sync(self):
+        if self.wall_sha1 == self.wall.digest:
+            return
+        fingerprints = [f"{end - start}:{key}" for key, start, end in self.wall.entries]
+        unseen = [i for i, fingerprint in enumerate(fingerprints) if fingerprint not in self.fingerprints]
+        previews = {}
+        for i, (_, text) in zip(unseen, self.wall.iter_entries(unseen)):
+            normalized = normalize(text)
+            digest = content_hash(normalized) if normalized else None
+            self.fingerprints[fingerprints[i]] = digest
+            if digest:
+                previews.setdefault(digest, (normalized, ' '.join(text.split())[:80]))
+        self.fingerprints = {fingerprint: self.fingerprints[fingerprint] for fingerprint in set(fingerprints)}
+        counts = Counter(self.fingerprints[fingerprint] for fingerprint in fingerprints)
+        counts.pop(None, None)
+
+        for digest in set(self.entries) - set(counts):
+            for key in band_keys(self.entries.pop(digest)['signature']):
+                self.buckets[key].remove(digest)
+                if not self.buckets[key]:
+                    del self.buckets[key]
+        for digest, count in counts.items():
+            entry = self.entries.get(digest)
+            if entry is None:
+                normalized, preview = previews[digest]
+                entry = self.entries[digest] = {'count': 0, 'signature': signature(normalized), 'preview': preview}
+                for key in band_keys(entry['signature']):
+                    self.buckets.setdefault(key, []).append(digest)
+            entry['count'] = count
+        self.wall_sha1 = self.wall.digest
+        self._save()
+
+    def _save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'entries': self.entries, 'buckets': self.buckets,
+                       'fingerprints': self.fingerprints, 'wall_sha1': self.wall_sha1}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def find_duplicates(self, new_texts):
+        '''
+        Check texts a change adds (and that the wall file already contains)
+        against the rest of the wall.
+
+        Returns a list of (text, reason) for every text that repeats an
+        existing entry exactly or nearly, or another text of the same change.
+        '''
+        new = [(text, content_hash(normalize(text))) for text in new_texts if normalize(text)]
+        new_counts = Counter(digest for _, digest in new)
+        duplicates = []
+        for text, digest in new:
+            entry = self.entries.get(digest)
+            if new_counts[digest] > 1:
+                duplicates.append((text, 'it appears more than once in this change'))
+                continue
+            if entry and entry['count'] > new_counts[digest]:
+                duplicates.append((text, f"it repeats an existing entry: \"{entry['preview']}\""))
+                continue
+            sig = signature(normalize(text))
+            # Entries whose only copies on the wall are this change's own texts are not repeats
+            candidates = {d for key in band_keys(sig) for d in self.buckets.get(key, ())
+                          if self.entries[d]['count'] > new_counts[d]}
+            best = max(candidates, key=lambda d: similarity(sig, self.entries[d]['signature']), default=None)
+            if best is not None:
+                score = similarity(sig, self.entries[best]['signature'])
+                if score >= NEAR_DUPLICATE_THRESHOLD:
+                    duplicates.append((text, f"it is {score:.0%} similar to an existing entry: "
+                                             f"\"{self.entries[best]['preview']}\""))
+        return duplicates
@@ -1,62 +1,133 @@
+import json
 import os
-from github import Github
+import sys
 from github.GithubException import GithubException
 
-def get_or_create_issue(repo_name: str, label_name: str, issue_title: str) -> int:
+# Repository root, so the shared client in src.http_client can be imported
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from src.http_client import get_github, github_token
+
+ISSUE_REGISTRY_PATH = '.github/cache/issue_registry.json'
+
+def _registry_key(repo_name: str, label_name: str, issue_title: str) -> str:
+    return f"{repo_name}|{label_name}|{issue_title}"
+
+def _load_registry() -> dict:
+    try:
+        with open(ISSUE_REGISTRY_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def _save_registry(registry: dict):
+    os.makedirs(os.path.dirname(ISSUE_REGISTRY_PATH), exist_ok=True)
+    tmp_path = ISSUE_REGISTRY_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(registry, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, ISSUE_REGISTRY_PATH)
+
+def _is_open_with_label(repo, issue_number: int, label_name: str) -> bool:
+    try:
+        issue = repo.get_issue(number=issue_number)
+    except GithubException:
+        return False
+    return issue.state == 'open' and any(label.name == label_name for label in issue.labels)
+
+def _search_open_issues(g, repo_name: str, label_names: list) -> dict:
+    '''Find the oldest open issue for each label with a single search request.'''
+    wanted = set(label_names)
+    found = {}
+    labels_query = ','.join(f'"{label}"' for label in label_names)
+    try:
+        results = g.search_issues(f'repo:{repo_name} is:issue is:open label:{labels_query}', sort='created', order='asc')
+        for issue in results:
+            for label in issue.labels:
+                if label.name in wanted and label.name not in found:
+                    found[label.name] = issue.number
+            if len(found) == len(wanted):
+                break
+    except GithubException as e:
+        # The search index can lag or be unavailable; the per-label slow path still works
+        print(f"Issue search failed, falling back to per-label lookups: {e}")
+    return found
+
+def _find_or_create_issue(repo, label_name: str, issue_title: str) -> int:
+    # Check if the label exists, create if not
+    try:
+        repo.get_label(label_name)
+    except GithubException as e:
+        if e.status == 404:
+            print(f"Label '{label_name}' not found, creating it.")
+            repo.create_label(label_name, "4caf50") # Default green color
+        else:
+            raise
+
+    issues = repo.get_issues(state='open', labels=[label_name])
+
+    found_issues = list(issues) # Convert PaginatedList to list to check length and sort
+
+    if found_issues:
+        # Sort by creation date, oldest first
+        found_issues.sort(key=lambda i: i.created_at)
+        print(f"Found existing issue #{found_issues[0].number} with label '{label_name}'.")
+        return found_issues[0].number
+    else:
+        print(f"No open issue found with label '{label_name}'. Creating a new one.")
+        new_issue = repo.create_issue(
+            title=issue_title,
+            labels=[label_name]
+        )
+        print(f"Created new issue #{new_issue.number} with title '{issue_title}' and label '{label_name}'.")
+        return new_issue.number
+
+def resolve_issues(repo_name: str, label_titles: dict) -> dict:
     '''
-    Finds an open issue with a specific label or creates a new one.
+    Resolves the log issue for several labels at once.
+
+    Known issue numbers come from a local registry and are checked with a single
+    issue fetch each. Unknown or closed ones are looked up together in one issue
+    search, and only labels still unresolved take the slow list-or-create path.
 
     Args:
         repo_name (str): The owner/repository name (e.g., 'octocat/Hello-World').
-        label_name (str): The label to search for or apply to a new issue.
-        issue_title (str): The title for the issue if it needs to be created.
+        label_titles (dict): Maps each label to the title used if its issue must be created.
 
     Returns:
-        int: The issue number.
+        dict: Maps each label to its issue number.
 
     Raises:
-        Exception: If there's an error interacting with the GitHub API or if GITHUB_TOKEN is not set.
+        Exception: If there's an error interacting with the GitHub API or if no token (GITHUB_TOKEN or ACCESS_TOKEN) is set.
     '''
-    github_token = os.getenv('GITHUB_TOKEN')
-    if not github_token:
-        raise ValueError("GITHUB_TOKEN environment variable is not set.")
-
-    g = Github(github_token)
+    token = github_token()
+    if not token:
+        raise ValueError("Neither GITHUB_TOKEN nor ACCESS_TOKEN environment variable is set.")
 
-    try:
-        repo = g.get_repo(repo_name)
-    except GithubException as e:
-        print(f"Error getting repository '{repo_name}': {e}")
-        raise
+    g = get_github(token)
+    repo = g.get_repo(repo_name, lazy=True)
+    registry = _load_registry()
+    resolved = {}
 
     try:
-        # Check if the label exists, create if not
-        try:
-            repo.get_label(label_name)
-        except GithubException as e:
-            if e.status == 404:
-                print(f"Label '{label_name}' not found, creating it.")
-                repo.create_label(label_name, "4caf50") # Default green color
+        misses = []
+        for label_name, issue_title in label_titles.items():
+            number = registry.get(_registry_key(repo_name, label_name, issue_title))
+            if number and _is_open_with_label(repo, number, label_name):
+                resolved[label_name] = number
             else:
-                raise
+                misses.append(label_name)
 
-        issues = repo.get_issues(state='open', labels=[label_name])
+        if misses:
+            found = _search_open_issues(g, repo_name, misses)
+            for label_name in misses:
+                if label_name in found:
+                    print(f"Found existing issue #{found[label_name]} with label '{label_name}'.")
+                    resolved[label_name] = found[label_name]
+                else:
+                    resolved[label_name] = _find_or_create_issue(repo, label_name, label_titles[label_name])
+                registry[_registry_key(repo_name, label_name, label_titles[label_name])] = resolved[label_name]
+            _save_registry(registry)
 
-        found_issues = list(issues) # Convert PaginatedList to list to check length and sort
-
-        if found_issues:
-            # Sort by creation date, oldest first
-            found_issues.sort(key=lambda i: i.created_at)
-            print(f"Found existing issue #{found_issues[0].number} with label '{label_name}'.")
-            return found_issues[0].number
-        else:
-            print(f"No open issue found with label '{label_name}'. Creating a new one.")
-            new_issue = repo.create_issue(
-                title=issue_title,
-                labels=[label_name]
-            )
-            print(f"Created new issue #{new_issue.number} with title '{issue_title}' and label '{label_name}'.")
-            return new_issue.number
+        return resolved
 
     except GithubException as e:
         print(f"GitHub API error: {e}")
@@ -65,6 +136,23 @@ def get_or_create_issue(repo_name: str, label_name: str, issue_title: str) -> in
         print(f"An unexpected error occurred: {e}")
         raise
 
+def get_or_create_issue(repo_name: str, label_name: str, issue_title: str) -> int:
+    '''
+    Finds an open issue with a specific label or creates a new one.
+
+    Args:
+        repo_name (str): The owner/repository name (e.g., 'octocat/Hello-World').
+        label_name (str): The label to search for or apply to a new issue.
+        issue_title (str): The title for the issue if it needs to be created.
+
+    Returns:
+        int: The issue number.
+
+    Raises:
+        Exception: If there's an error interacting with the GitHub API or if GITHUB_TOKEN is not set.
+    '''
+    return resolve_issues(repo_name, {label_name: issue_title})[label_name]
+
 if __name__ == '__main__':
     # Example usage (requires GITHUB_TOKEN and GITHUB_REPOSITORY to be set)
     # This part is for testing the script directly and should not run in production workflows as is.
@@ -1,13 +1,19 @@
 import os
 import re
 import sys
-from github import Github
+from collections import Counter
 import markdown
 from datetime import datetime
+from github.GithubException import GithubException
 
 # Add .github/scripts to sys.path to find github_utils
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
-from github_utils import get_or_create_issue
+from comment_outbox import CommentOutbox
+from duplicate_index import DuplicateIndex
+from github_utils import resolve_issues
+from wall_index import messages_index, stories_index
+from src.http_client import get_github, github_token
+from src.metrics import get_metrics, write_metrics
 
 # Constants for Messages Log
 MESSAGES_LOG_LABEL = "community-messages"
@@ -49,34 +55,28 @@ def validate_story(content):
     return True
 
 def process_messages():
-    with open('MESSAGES.md', 'r', encoding='utf-8') as f:
-        content = f.read()
-    
+    """Sort MESSAGES.md in place, streaming entries through the wall index"""
+    index = messages_index('MESSAGES.md')
+    header = index.read_header()
+
     # Ensure proper structure
-    if '# Community Messages for the One Billionth Repo' not in content:
-        content = '# Community Messages for the One Billionth Repo\n\n' + content
+    if '# Community Messages for the One Billionth Repo' not in header:
+        header = '# Community Messages for the One Billionth Repo\n\n' + header
     
-    if 'Add your message below!' not in content:
-        content = content.replace('# Community Messages for the One Billionth Repo\n',
+    if 'Add your message below!' not in header:
+        header = header.replace('# Community Messages for the One Billionth Repo\n',
                                 '# Community Messages for the One Billionth Repo\n\n'
                                 'Add your message below!  \n'
                                 '_You can add a PR or comment with your congratulations, jokes, or hopes for the future._\n\n---\n\n')
     
-    # Sort messages
-    messages = content.split('---\n\n')[1].strip().split('\n')
-    messages = [m for m in messages if m.strip() and validate_message(m)]
-    messages.sort()
-    
-    # Rebuild file
-    header = content.split('---\n\n')[0] + '---\n\n'
-    return header + '\n'.join(messages)
+    # Messages were already validated by main, so they are only sorted here, by their cached keys
+    index.sort(header=header)
 
 def process_stories():
-    try:
-        with open('STORIES.md', 'r', encoding='utf-8') as f:
-            content = f.read()
-    except FileNotFoundError:
-        content = '''# GitHub Stories
+    """Sort STORIES.md in place by title, streaming sections through the wall index"""
+    if not os.path.exists('STORIES.md'):
+        with open('STORIES.md', 'w', encoding='utf-8') as f:
+            f.write('''# GitHub Stories
 
 Share your GitHub journey and experiences here! Add your story with a pull request.
 
@@ -88,161 +88,296 @@ Share your GitHub journey and experiences here! Add your story with a pull reque
 
 ---
 
-'''
+''')
     
-    # Split into sections and validate
-    sections = re.split(r'(?=##\s+)', content)
-    header = sections[0]
-    stories = sections[1:]
-    
-    # Sort stories by title
-    stories = [s for s in stories if validate_story(s)]
-    stories.sort(key=lambda x: re.search(r'##\s+(.*)', x).group(1).lower())
-    
-    return header + '\n'.join(stories)
+    # Stories were already validated by main, so they are only sorted here, by their cached keys
+    stories_index('STORIES.md').sort()
 
-def main():
-    token = os.getenv('ACCESS_TOKEN')
-    if not token: 
-        print("Error: Missing GITHUB_TOKEN.", file=sys.stderr)
+def added_lines(patch):
+    """Lines a unified diff adds, minus lines it only moved (removed and re-added)"""
+    removed = Counter(line[1:] for line in patch.split('\n') if line.startswith('-') and not line.startswith('---'))
+    added = []
+    for line in patch.split('\n'):
+        if not line.startswith('+') or line.startswith('+++'):
+            continue
+        if removed[line[1:]]:
+            removed[line[1:]] -= 1
+            continue
+        added.append(line[1:])
+    return added
+
+def added_messages(patch):
+    return [line.strip() for line in added_lines(patch) if line.strip()]
+
+def added_stories(patch):
+    # Added lines that do not start a new "## " section are edits to existing stories
+    text = '\n'.join(added_lines(patch))
+    sections = re.split(r'(?=^##\s+)', text, flags=re.MULTILINE)
+    return [s.strip() for s in sections if s.strip().startswith('## ')]
+
+def split_messages(content):
+    """Every non-blank line after the '---' separator of MESSAGES.md"""
+    parts = content.split('---\n\n', 1)
+    if len(parts) < 2:
+        return []
+    return [line.strip() for line in parts[1].strip().split('\n') if line.strip()]
+
+def split_stories(content):
+    """Every '## ' section of STORIES.md after its header, except the guidelines"""
+    header_match = re.match(r'.*?---\n\n', content, re.DOTALL)
+    if header_match:
+        stories_text_block = content[len(header_match.group(0)):]  # the header includes the ---
+    else: # Fallback if --- is not present, or if content starts directly with stories.
+          # This assumes the Guideline/Intro part might not have '---' if it's very simple.
+        intro_end_match = re.match(r'(# GitHub Stories\n+(## Guidelines\n.*?\n)?)(?=^##\s+)', content, re.DOTALL | re.MULTILINE)
+        if intro_end_match:
+            stories_text_block = content[len(intro_end_match.group(1)):]
+        else: # If no clear intro, assume all are stories or story-like content
+            stories_text_block = content
+
+    stories = []
+    for story_content_full in re.split(r'(?=^##\s+)', stories_text_block, flags=re.MULTILINE):
+        story_content_clean = story_content_full.strip()
+        # Ensure it actually starts like a story heading, protects against random text blocks
+        if story_content_clean.startswith('## ') and not story_content_clean.startswith("## Guidelines"):
+            stories.append(story_content_clean)
+    return stories
+
+def added_entries(entries, base_entries):
+    """Entries not in ``base_entries``, counting repeats, for files GitHub sends no patch for"""
+    remaining = Counter(base_entries)
+    added = []
+    for entry in entries:
+        if remaining[entry]:
+            remaining[entry] -= 1
+            continue
+        added.append(entry)
+    return added
+
+def base_file_content(repo, pr, path):
+    """``path`` as of the PR's base, or "" if the base does not have it"""
+    try:
+        return repo.get_contents(path, ref=pr.base.sha).decoded_content.decode('utf-8')
+    except GithubException as e:
+        if e.status == 404:
+            return ''
+        raise
+
+def reject_duplicates(wall, new_entries, kind):
+    """Exit before anything is posted if a new entry repeats one already on the wall"""
+    duplicates = DuplicateIndex(wall).find_duplicates(new_entries)
+    for text, reason in duplicates:
+        print(f"Duplicate {kind} in {wall.path.name} (content starts with: \"{text.strip()[:50]}...\"): {reason}", file=sys.stderr)
+    if duplicates:
+        print(f"Duplicate entries found in {wall.path.name}. Nothing will be posted. MD file will not be updated.", file=sys.stderr)
         sys.exit(1)
 
-    g = Github(token)
+def get_log_issues(repo, repo_name, label_titles):
+    """The log issue of every label in ``label_titles``, resolved together; None for each on error"""
+    if not label_titles:
+        return {}
     try:
-        repo = g.get_repo(repo_name)
-        pr = repo.get_pull(pr_number)
+        numbers = resolve_issues(repo_name, label_titles)
     except Exception as e:
-        print(f"Error: Could not access GitHub repository or pull request: {e}", file=sys.stderr)
+        print(f"Error getting or creating log issues {', '.join(label_titles)}: {e}", file=sys.stderr)
+        return dict.fromkeys(label_titles)
+    issues = {}
+    for label, number in numbers.items():
+        try:
+            issues[label] = repo.get_issue(number=number)
+            print(f"Fetched log issue #{number} ('{label}')")
+        except Exception as e:
+            print(f"Error fetching '{label}' log issue #{number}: {e}", file=sys.stderr)
+            issues[label] = None
+    return issues
+
+def process_messages_incremental(repo, pr, patch, messages_issue):
+    """Validate, publish and merge only the messages this PR adds"""
+    new_messages = added_messages(patch)
+    invalid = [m for m in new_messages if not validate_message(m)]
+    for msg_content in invalid:
+        print(f"Validation failed for message: \"{msg_content}\" in MESSAGES.md", file=sys.stderr)
+    if invalid:
+        print("Validation failed for one or more messages in MESSAGES.md. No messages will be posted to the issue. MD file will not be updated.", file=sys.stderr)
         sys.exit(1)
+    if not new_messages:
+        print("No new messages added by this PR.")
+        return
+    index = messages_index('MESSAGES.md')
+    reject_duplicates(index, new_messages, 'message')
 
-    files_changed = [f.filename for f in pr.get_files()]
-    
-    if 'MESSAGES.md' in files_changed:
+    if messages_issue:
+        outbox = CommentOutbox(repo)
+        for valid_msg in new_messages:
+            outbox.add(messages_issue, f"New message from PR #{pr.number} by @{pr.user.login}:\n\n{valid_msg}")
+        outbox.flush()
+
+    index.insert_sorted(new_messages)
+
+def process_stories_incremental(repo, pr, patch, stories_issue):
+    """Validate, publish and merge only the stories this PR adds"""
+    new_stories = added_stories(patch)
+    invalid = [story for story in new_stories if not validate_story(story)]
+    for story in invalid:
+        print(f"Validation failed for a story in STORIES.md (content starts with: \"{story[:50]}...\")", file=sys.stderr)
+    if invalid:
+        print("Validation failed for one or more stories in STORIES.MD. No stories will be posted. MD file will not be updated.", file=sys.stderr)
+        sys.exit(1)
+    if not new_stories:
+        print("No new stories added by this PR.")
+        return
+    index = stories_index('STORIES.md')
+    reject_duplicates(index, new_stories, 'story')
+
+    if stories_issue:
+        outbox = CommentOutbox(repo)
+        for story_to_post in new_stories:
+            outbox.add(stories_issue, f"New story from PR #{pr.number} by @{pr.user.login}:\n\n---\n\n{story_to_post}\n\n---")
+        outbox.flush()
+
+    index.insert_sorted(new_stories)
+
+def main():
+    token = github_token()
+    if not token: 
+        print("Error: Missing GITHUB_TOKEN.", file=sys.stderr)
+        sys.exit(1)
+
+    repo_name = os.getenv('GITHUB_REPOSITORY')
+    pr_number = int(os.getenv('PR_NUMBER', '0'))
+    g = get_github(token)
+    metrics = get_metrics()
+    with metrics.stage('fetch'):
         try:
-            messages_file_content = repo.get_contents("MESSAGES.md", ref=pr.head.sha).decoded_content.decode('utf-8')
-            messages_issue = None
+            repo = g.get_repo(repo_name)
+            pr = repo.get_pull(pr_number)
+        except Exception as e:
+            print(f"Error: Could not access GitHub repository or pull request: {e}", file=sys.stderr)
+            sys.exit(1)
+
+        # Incremental mode works from each file's patch, so per-PR cost depends on the
+        # size of the contribution. Files GitHub sends no patch for (too large) fall
+        # back to re-reading and re-validating the whole file.
+        changed_files = {f.filename: f for f in pr.get_files()}
+
+        # Both log issues are resolved in one go, so a PR touching both files
+        # validates or searches for them once
+        logs = {}
+        if 'MESSAGES.md' in changed_files:
+            logs[MESSAGES_LOG_LABEL] = MESSAGES_LOG_TITLE
+        if 'STORIES.md' in changed_files:
+            logs[STORIES_LOG_LABEL] = STORIES_LOG_TITLE
+        log_issues = get_log_issues(repo, repo_name, logs)
+
+    with metrics.stage('messages'):
+        if 'MESSAGES.md' in changed_files and changed_files['MESSAGES.md'].patch is not None:
             try:
-                messages_issue_number = get_or_create_issue(repo_name, MESSAGES_LOG_LABEL, MESSAGES_LOG_TITLE)
-                messages_issue = repo.get_issue(number=messages_issue_number)
-                print(f"Fetched messages log issue #{messages_issue.number}")
+                process_messages_incremental(repo, pr, changed_files['MESSAGES.md'].patch,
+                                             log_issues[MESSAGES_LOG_LABEL])
             except Exception as e:
-                print(f"Error getting or creating messages log issue: {e}", file=sys.stderr)
+                print(f"Error processing MESSAGES.md: {e}", file=sys.stderr)
+                sys.exit(1)
+        elif 'MESSAGES.md' in changed_files:
+            try:
+                messages_file_content = repo.get_contents("MESSAGES.md", ref=pr.head.sha).decoded_content.decode('utf-8')
                 # Continue to update MD file even if issue posting fails for now
+                messages_issue = log_issues[MESSAGES_LOG_LABEL]
 
-            # Extract messages after the '---' separator
-            parts = messages_file_content.split('---\n\n', 1)
-            if len(parts) > 1:
-                individual_messages = parts[1].strip().split('\n')
-                all_messages_valid = True # Flag to track validation status
-                valid_messages_for_posting = [] # Store messages that pass validation
-
-                for msg_content in individual_messages:
-                    msg_content = msg_content.strip()
-                    if msg_content: # Process only non-empty lines
-                        if not validate_message(msg_content):
-                            print(f"Validation failed for message: \"{msg_content}\" in MESSAGES.md", file=sys.stderr)
-                            all_messages_valid = False
-                            # Do not exit immediately, report all validation errors for the file if any.
-                        else:
-                            # Store valid messages if we need to post them later
-                            # This assumes we only post if ALL messages in the PR are valid.
-                            # Or, we could post them one by one here.
-                            # For now, let's collect them and post after all are validated.
-                            valid_messages_for_posting.append(msg_content)
-
-                if not all_messages_valid:
-                    print("Validation failed for one or more messages in MESSAGES.md. No messages will be posted to the issue. MD file will not be updated.", file=sys.stderr)
-                    sys.exit(1) # Exit if any message validation fails
-
-                # If all messages are valid, then proceed to post them
-                if messages_issue and all_messages_valid: # all_messages_valid is redundant here due to sys.exit(1) above, but good for clarity
-                    pr_author = pr.user.login
-                    for valid_msg in valid_messages_for_posting:
-                        try:
+                # Extract messages after the '---' separator
+                parts = messages_file_content.split('---\n\n', 1)
+                if len(parts) > 1:
+                    individual_messages = split_messages(messages_file_content)
+                    all_messages_valid = True # Flag to track validation status
+                    valid_messages_for_posting = [] # Store messages that pass validation
+
+                    for msg_content in individual_messages:
+                        msg_content = msg_content.strip()
+                        if msg_content: # Process only non-empty lines
+                            if not validate_message(msg_content):
+                                print(f"Validation failed for message: \"{msg_content}\" in MESSAGES.md", file=sys.stderr)
+                                all_messages_valid = False
+                                # Do not exit immediately, report all validation errors for the file if any.
+                            else:
+                                # Store valid messages if we need to post them later
+                                # This assumes we only post if ALL messages in the PR are valid.
+                                # Or, we could post them one by one here.
+                                # For now, let's collect them and post after all are validated.
+                                valid_messages_for_posting.append(msg_content)
+
+                    if not all_messages_valid:
+                        print("Validation failed for one or more messages in MESSAGES.md. No messages will be posted to the issue. MD file will not be updated.", file=sys.stderr)
+                        sys.exit(1) # Exit if any message validation fails
+
+                    # Without a patch, the messages this PR adds are the ones its base lacks
+                    base_messages = split_messages(base_file_content(repo, pr, "MESSAGES.md"))
+                    reject_duplicates(messages_index('MESSAGES.md'),
+                                      added_entries(valid_messages_for_posting, base_messages), 'message')
+
+                    # If all messages are valid, then proceed to post them
+                    if messages_issue and all_messages_valid: # all_messages_valid is redundant here due to sys.exit(1) above, but good for clarity
+                        pr_author = pr.user.login
+                        outbox = CommentOutbox(repo)
+                        for valid_msg in valid_messages_for_posting:
                             comment_body = f"New message from PR #{pr.number} by @{pr_author}:\n\n{valid_msg}"
-                            messages_issue.create_comment(comment_body)
-                            print(f"Posted message to issue #{messages_issue.number}: {valid_msg}")
-                        except Exception as e:
-                            print(f"Error posting message to issue #{messages_issue.number}: {e}", file=sys.stderr)
-
-            # If all validations pass (implicit due to potential sys.exit(1) above), process the entire file for sorting and structuring
-            processed_content = process_messages()
-            with open('MESSAGES.md', 'w', encoding='utf-8') as f:
-                f.write(processed_content)
-        except Exception as e:
-            print(f"Error processing MESSAGES.md: {e}", file=sys.stderr)
-            sys.exit(1)
+                            outbox.add(messages_issue, comment_body)
+                        outbox.flush()
 
-    if 'STORIES.md' in files_changed:
-        try:
-            stories_file_content = repo.get_contents("STORIES.md", ref=pr.head.sha).decoded_content.decode('utf-8')
-            stories_issue = None
+                # If all validations pass (implicit due to potential sys.exit(1) above), process the entire file for sorting and structuring
+                process_messages()
+            except Exception as e:
+                print(f"Error processing MESSAGES.md: {e}", file=sys.stderr)
+                sys.exit(1)
+
+    with metrics.stage('stories'):
+        if 'STORIES.md' in changed_files and changed_files['STORIES.md'].patch is not None:
             try:
-                stories_issue_number = get_or_create_issue(repo_name, STORIES_LOG_LABEL, STORIES_LOG_TITLE)
-                stories_issue = repo.get_issue(number=stories_issue_number)
-                print(f"Fetched stories log issue #{stories_issue.number}")
+                process_stories_incremental(repo, pr, changed_files['STORIES.md'].patch,
+                                            log_issues[STORIES_LOG_LABEL])
             except Exception as e:
-                print(f"Error getting or creating stories log issue: {e}", file=sys.stderr)
+                print(f"Error processing STORIES.md: {e}", file=sys.stderr)
+                sys.exit(1)
+        elif 'STORIES.md' in changed_files:
+            try:
+                stories_file_content = repo.get_contents("STORIES.md", ref=pr.head.sha).decoded_content.decode('utf-8')
                 # Continue to update MD file even if issue posting fails for now
+                stories_issue = log_issues[STORIES_LOG_LABEL]
 
-            header_match = re.match(r'.*?---\n\n', stories_file_content, re.DOTALL)
-            if header_match:
-                header_part = header_match.group(0) # Includes the ---
-                stories_text_block = stories_file_content[len(header_part):]
-            else: # Fallback if --- is not present, or if content starts directly with stories.
-                  # This assumes the Guideline/Intro part might not have '---' if it's very simple.
-                intro_end_match = re.match(r'(# GitHub Stories\n+(## Guidelines\n.*?\n)?)(?=^##\s+)', stories_file_content, re.DOTALL | re.MULTILINE)
-                if intro_end_match:
-                    stories_text_block = stories_file_content[len(intro_end_match.group(1)):]
-                else: # If no clear intro, assume all are stories or story-like content
-                    stories_text_block = stories_file_content
-
-            individual_stories_from_file = re.split(r'(?=^##\s+)', stories_text_block, flags=re.MULTILINE)
-
-            all_stories_valid = True
-            valid_stories_for_posting = []
-
-            for story_content_full in individual_stories_from_file:
-                story_content_clean = story_content_full.strip()
-
-                # Skip empty parts or known non-story sections if they weren't filtered by split logic
-                if not story_content_clean or \
-                   story_content_clean.startswith("## Guidelines") or \
-                   (story_content_clean == "# GitHub Stories" and "# GitHub Stories" in header_part): # Avoid re-validating title if it was part of header
-                    continue
-
-                # Ensure it actually starts like a story heading, protects against random text blocks
-                if not story_content_clean.startswith('## '):
-                    continue
-
-                if not validate_story(story_content_clean): # validate_story expects a full story including its "## Title"
-                    print(f"Validation failed for a story in STORIES.md (content starts with: \"{story_content_clean[:50]}...\")", file=sys.stderr)
-                    all_stories_valid = False
-                    # Continue checking other stories to list all errors if desired, or break if one error is enough.
-                    # Current validate_story prints specific errors. This general message is also helpful.
-                else:
-                    valid_stories_for_posting.append(story_content_clean)
-
-            if not all_stories_valid:
-                print("Validation failed for one or more stories in STORIES.MD. No stories will be posted. MD file will not be updated.", file=sys.stderr)
-                sys.exit(1)
+                all_stories_valid = True
+                valid_stories_for_posting = []
+
+                for story_content_clean in split_stories(stories_file_content):
+                    if not validate_story(story_content_clean): # validate_story expects a full story including its "## Title"
+                        print(f"Validation failed for a story in STORIES.md (content starts with: \"{story_content_clean[:50]}...\")", file=sys.stderr)
+                        all_stories_valid = False
+                        # Continue checking other stories to list all errors if desired, or break if one error is enough.
+                        # Current validate_story prints specific errors. This general message is also helpful.
+                    else:
+                        valid_stories_for_posting.append(story_content_clean)
+
+                if not all_stories_valid:
+                    print("Validation failed for one or more stories in STORIES.MD. No stories will be posted. MD file will not be updated.", file=sys.stderr)
+                    sys.exit(1)
 
-            if stories_issue and all_stories_valid: # all_stories_valid is redundant due to sys.exit(1)
-                pr_author = pr.user.login
-                for story_to_post in valid_stories_for_posting:
-                    try:
+                # Without a patch, the stories this PR adds are the ones its base lacks
+                base_stories = split_stories(base_file_content(repo, pr, "STORIES.md"))
+                reject_duplicates(stories_index('STORIES.md'),
+                                  added_entries(valid_stories_for_posting, base_stories), 'story')
+
+                if stories_issue and all_stories_valid: # all_stories_valid is redundant due to sys.exit(1)
+                    pr_author = pr.user.login
+                    outbox = CommentOutbox(repo)
+                    for story_to_post in valid_stories_for_posting:
                         comment_body = f"New story from PR #{pr.number} by @{pr_author}:\n\n---\n\n{story_to_post}\n\n---"
-                        stories_issue.create_comment(comment_body)
-                        print(f"Posted story to issue #{stories_issue.number} (content starts with: \"{story_to_post[:50]}...\")")
-                    except Exception as e:
-                        print(f"Error posting story to issue #{stories_issue.number}: {e}", file=sys.stderr)
-
-            processed_content = process_stories()
-            with open('STORIES.md', 'w', encoding='utf-8') as f:
-                f.write(processed_content)
-        except Exception as e:
-            print(f"Error processing STORIES.md: {e}", file=sys.stderr)
-            sys.exit(1)
+                        outbox.add(stories_issue, comment_body)
+                    outbox.flush()
+
+                process_stories()
+            except Exception as e:
+                print(f"Error processing STORIES.md: {e}", file=sys.stderr)
+                sys.exit(1)
 
 if __name__ == '__main__':
-    main()
+    try:
+        main()
+    finally:
+        write_metrics('process_community_content')
@@ -1,92 +1,115 @@
-from github import Github
 import os
 import datetime
-import json
-from pathlib import Path
+import re
 import sys
 
 # Add the repository root to sys.path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from src.github_api import GitHubAPI
+from src.github_api import GitHubAPI, language_rollup_view
+from src.metrics import get_metrics, write_metrics
+from src.search_shards import get_exact_language_stats
+from src.render import ensure_regions, read_region, render_regions, write_if_changed
+from src.snapshots import SnapshotStore
+from src.star_index import get_trending_by_growth
 
-def update_readme_stats(stats, content):
-    stats_section = f"""## 📊 Repository Stats
-- ⭐ Stars: {stats['stars']}
+STATS_REPOSITORY = "AasishPokhrel/shit"
+TRENDING_LIMIT = 30
+
+README_REGIONS = {
+    'stats': "## 📊 Repository Stats",
+    'trending': "### 🔥 Trending Repositories",
+    'languages': "### 🎨 By Programming Language",
+}
+
+def render_stats_section(stats, last_updated):
+    return f"""- ⭐ Stars: {stats['stars']}
 - 🍴 Forks: {stats['forks']}
 - 📬 Open Issues: {stats['issues']}
 - 👀 Watchers: {stats['watchers']}
-- 📅 Last Updated: {datetime.datetime.now().strftime('%Y-%m-%d %H:%M UTC')}
+- 📅 Last Updated: {last_updated}
 """
-    return content.replace("## 📊 Repository Stats\n", stats_section)
 
-def update_trending_section(trending_repos, content):
-    trending_section = "### 🔥 Trending Repositories\n"
+def render_trending_section(trending_repos):
+    trending_section = ""
     for repo in trending_repos[:5]:
-        trending_section += f"- [{repo['full_name']}]({repo['html_url']}): {repo['description']} ⭐{repo['stargazers_count']}\n"
-    
-    return content.replace("### 🔥 Trending Repositories\n", trending_section)
+        trending_section += f"- [{repo.full_name}]({repo.html_url}): {repo.description} ⭐{repo.stargazers_count}\n"
+    return trending_section
 
-def update_language_section(language_stats, content):
-    language_section = "### 🎨 By Programming Language\n"
+def render_language_section(language_stats):
+    language_section = ""
     for lang, stats in sorted(language_stats.items(), key=lambda x: x[1]['stars'], reverse=True)[:5]:
         language_section += f"- {lang}: {stats['count']} repositories, {stats['stars']} total stars\n"
-    
-    return content.replace("### 🎨 By Programming Language\n", language_section)
+    return language_section
 
-def main():
-    # Initialize API clients
-    github_token = os.environ['GITHUB_TOKEN']
-    g = Github(github_token)
-    api = GitHubAPI(github_token)
-    
-    # Get repository stats
-    repo = g.get_repo("AasishPokhrel/shit")
-    stats = {
-        'stars': repo.stargazers_count,
-        'forks': repo.forks_count,
-        'issues': repo.open_issues_count,
-        'watchers': repo.watchers_count
+def render_readme(content, stats, trending_repos, language_stats):
+    """Render every generated README region in one pass.
+
+    The "Last Updated" stamp only moves when something else in the README
+    changed, so an idle run leaves the file byte-for-byte identical.
+    """
+    content = ensure_regions(content, README_REGIONS)
+    regions = {
+        'trending': render_trending_section(trending_repos),
+        'languages': render_language_section(language_stats),
     }
+    previous = re.search(r"Last Updated: (.*)", read_region(content, 'stats') or "")
+    if previous:
+        unchanged = render_regions(content, {**regions, 'stats': render_stats_section(stats, previous.group(1))})
+        if unchanged == content:
+            return content
+    now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M UTC')
+    return render_regions(content, {**regions, 'stats': render_stats_section(stats, now)})
+
+def main(timestamp, api=None, trending_repos=None):
+    # Initialize API clients (the pipeline runner passes its shared client, and
+    # the trending search result when another job already fetched it)
+    api = api or GitHubAPI(os.environ['GITHUB_TOKEN'])
+    metrics = get_metrics()
     
-    # Get trending repositories
-    trending_repos = api.get_trending_repos(since="weekly")
-    
-    # Get language statistics
-    language_stats = api.get_language_stats()
-    
-    # Get topic statistics
-    topics = ["ai", "web-development", "mobile", "devops", "security"]
-    topic_stats = api.get_topic_stats(topics)
+    with metrics.stage('fetch'):
+        # Repository counters and topic statistics; with GITHUB_API_BACKEND=graphql
+        # these are packed into one or two batched queries
+        topics = ["ai", "web-development", "mobile", "devops", "security"]
+        topic_stats, repo_stats, errors = api.get_batch_stats(topics, [STATS_REPOSITORY])
+        if STATS_REPOSITORY in errors:
+            raise errors.pop(STATS_REPOSITORY)
+        stats = repo_stats[STATS_REPOSITORY]
+        for topic, error in errors.items():
+            print(f"Error fetching stats for topic '{topic}': {error}", file=sys.stderr)
+        
+        # Trending repositories, ranked by star growth, and language statistics
+        if trending_repos is None:
+            trending_repos = get_trending_by_growth(api, TRENDING_LIMIT)
+        if os.getenv("LANGUAGE_STATS", "sample") == "exact":
+            # Counts every repository above the star threshold; many more searches
+            language_stats = get_exact_language_stats(api)
+        else:
+            language_stats = api.get_views([language_rollup_view("languages")])["languages"]
     
     # Update README
-    with open('README.md', 'r', encoding='utf-8') as file:
-        content = file.read()
-    
-    content = update_readme_stats(stats, content)
-    content = update_trending_section(trending_repos.get('items', []), content)
-    content = update_language_section(language_stats, content)
-    
-    with open('README.md', 'w', encoding='utf-8') as file:
-        file.write(content)
+    with metrics.stage('render'):
+        with open('README.md', 'r', encoding='utf-8') as file:
+            content = file.read()
+        
+        content = render_readme(content, stats, trending_repos.get('items', []), language_stats)
+        if not write_if_changed('README.md', content):
+            print("README.md is already up to date.")
     
     # Save detailed stats for historical tracking
-    stats_dir = Path('.github/stats')
-    stats_dir.mkdir(exist_ok=True)
-    
-    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M')
-    stats_file = stats_dir / f'stats_{timestamp}.json'
-    
-    full_stats = {
-        'repository': stats,
-        'trending': trending_repos,
-        'languages': language_stats,
-        'topics': topic_stats,
-        'timestamp': timestamp
-    }
-    
-    with open(stats_file, 'w', encoding='utf-8') as f:
-        json.dump(full_stats, f, indent=2)
+    with metrics.stage('snapshot_write'):
+        store = SnapshotStore('.github/stats')
+        store.append(timestamp, {
+            'repository': stats,
+            'trending': trending_repos,
+            'languages': language_stats,
+            'topics': topic_stats
+        })
 
 if __name__ == "__main__":
-    main()
+    # The run's metrics are written next to the snapshot, even when the run fails
+    timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M')
+    try:
+        main(timestamp)
+    finally:
+        write_metrics('updates_stats', timestamp)
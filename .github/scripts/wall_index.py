@@ -0,0 +1,199 @@
+import bisect
+import hashlib
+import json
+import os
+import re
+from pathlib import Path
+
+INDEX_DIR = '.github/cache'
+HEADER_SEPARATOR = b'---'
+
+STORY_HEADING = re.compile(rb'##\s+(.*)')
+
+
+def story_key(line: bytes):
+    '''Sort key of a line that starts a story section, or None.'''
+    if not line.startswith(b'## '):
+        return None
+    match = STORY_HEADING.match(line)
+    return match.group(1).strip().decode('utf-8').lower() if match else None
+
+
+def message_key(line: bytes):
+    '''Every non-blank line after the header is one message, sorted by its text.'''
+    stripped = line.strip()
+    return stripped.decode('utf-8') if stripped else None
+
+
+class WallIndex:
+    '''
+    Byte-offset index over the entries of MESSAGES.md or STORIES.md.
+
+    The file is parsed in one streaming pass: everything up to the first
+    "---" line (plus the blank line after it) is the header, and each later
+    line for which ``key_func`` returns a key starts a new entry. The index
+    (entry keys and byte ranges) is persisted next to the other caches and
+    reused while the file's content hash is unchanged, so sorting and
+    inserting never re-run a regex over the whole wall.
+
+    Args:
+        path (str): The wall file.
+        key_func: story_key or message_key.
+        separator (bytes): Blank space to keep between consecutive entries.
+    '''
+
+    def __init__(self, path: str, key_func, separator: bytes):
+        self.path = Path(path)
+        self.key_func = key_func
+        self.separator = separator
+        self.index_path = Path(INDEX_DIR) / f"{self.path.name}.idx.json"
+        self.header_end = 0
+        self.entries = []  # [key, start, end] in file order
+        self.digest = None  # SHA-1 of the file the entries describe
+        self._load_or_build()
+
+    def _file_digest(self) -> str:
+        digest = hashlib.sha1()
+        with open(self.path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def _load_or_build(self):
+        digest = self.digest = self._file_digest()
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+            if saved.get('sha1') == digest:
+                self.header_end = saved['header_end']
+                self.entries = saved['entries']
+                return
+        except (OSError, ValueError, KeyError):
+            pass
+        self._build()
+        self._save(digest)
+
+    def _build(self):
+        self.header_end, self.entries = 0, []
+        in_header = True
+        offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                start, offset = offset, offset + len(line)
+                if in_header:
+                    if line.rstrip() == HEADER_SEPARATOR:
+                        in_header = False
+                        self.header_end = offset
+                    continue
+                key = self.key_func(line)
+                if key is not None:
+                    self.entries.append([key, start, offset])
+                elif self.entries:
+                    self.entries[-1][2] = offset  # blank or continuation lines belong to the entry above
+                elif start == self.header_end and not line.strip():
+                    self.header_end = offset  # the blank line right after "---"
+        if in_header:
+            # No separator: treat the whole file as header so nothing is lost
+            self.header_end = offset
+
+    def _save(self, digest: str):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'sha1': digest, 'header_end': self.header_end, 'entries': self.entries}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def read_header(self) -> str:
+        with open(self.path, 'rb') as f:
+            return f.read(self.header_end).decode('utf-8')
+
+    def iter_entries(self, positions=None):
+        '''Stream (key, text) for every entry in file order, or only for those at ``positions``.'''
+        with open(self.path, 'rb') as f:
+            for i in range(len(self.entries)) if positions is None else positions:
+                key, start, end = self.entries[i]
+                f.seek(start)
+                yield key, f.read(end - start).decode('utf-8')
+
+    def rewrite(self, order, header: str = None):
+        '''
+        Rewrite the file as the header followed by ``order``, whose items are
+        either positions into self.entries or new (key, text) pairs, then
+        update the index from the offsets actually written.
+        '''
+        tmp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        entries = []
+        with open(self.path, 'rb') as src, open(tmp_path, 'wb') as out:
+            header_bytes = src.read(self.header_end)
+            if header is not None:
+                header_bytes = header.encode('utf-8')
+            out.write(header_bytes)
+            tail = b''
+            for item in order:
+                if isinstance(item, int):
+                    key, start, end = self.entries[item]
+                    src.seek(start)
+                    data = src.read(end - start).rstrip(b'\n') + b'\n'
+                else:
+                    key, text = item
+                    data = text.strip().encode('utf-8') + b'\n'
+                missing = len(self.separator) - (len(tail) - len(tail.rstrip(b'\n')))
+                if entries and missing > 0:
+                    # Pad the previous entry so consecutive entries stay separated
+                    out.write(b'\n' * missing)
+                    entries[-1][2] += missing
+                start = out.tell()
+                out.write(data)
+                entries.append([key, start, out.tell()])
+                tail = data
+        os.replace(tmp_path, self.path)
+        self.header_end = len(header_bytes)
+        self.entries = entries
+        self.digest = self._file_digest()
+        self._save(self.digest)
+
+    def insert_sorted(self, new_texts):
+        '''
+        Move ``new_texts`` to their sorted positions by binary search on the
+        existing keys. Copies of them already in the file (e.g. where a PR
+        appended them) are dropped first; the rest of the file is assumed sorted.
+        '''
+        new = []
+        for text in new_texts:
+            first_line = text.strip().split('\n', 1)[0].encode('utf-8') + b'\n'
+            new.append((self.key_func(first_line), text.strip()))
+        new_set = {text for _, text in new}
+        new_keys = {key for key, _ in new}
+
+        # Only entries sharing a key with a new one can be a copy of it, so only those are read
+        kept = []
+        with open(self.path, 'rb') as f:
+            for i, (key, start, end) in enumerate(self.entries):
+                if key in new_keys:
+                    f.seek(start)
+                    if f.read(end - start).decode('utf-8').strip() in new_set:
+                        continue
+                kept.append(i)
+        keys = [self.entries[i][0] for i in kept]
+        slots = {}
+        for key, text in new:
+            slots.setdefault(bisect.bisect_right(keys, key), []).append((key, text))
+
+        order = []
+        for position, i in enumerate(kept + [None]):
+            order.extend(sorted(slots.get(position, [])))
+            if i is not None:
+                order.append(i)
+        self.rewrite(order)
+
+    def sort(self, header: str = None):
+        '''Full sort of every entry by its precomputed key, optionally replacing the header.'''
+        self.rewrite(sorted(range(len(self.entries)), key=lambda i: self.entries[i][0]), header=header)
+
+
+def stories_index(path: str = 'STORIES.md') -> WallIndex:
+    return WallIndex(path, story_key, b'\n\n')
+
+
+def messages_index(path: str = 'MESSAGES.md') -> WallIndex:
+    return WallIndex(path, message_key, b'\n')
@@ -0,0 +1,238 @@
+"""Offline end-to-end benchmarks for the stats, trending, community and viz scripts
+and the single-process pipeline that runs stats, trending and viz together.
+
+Each script runs in a fresh subprocess inside a scratch working directory,
+pointed at a local GitHub API stand-in through GITHUB_API_URL. For every
+script the suite records requests made, bytes transferred, wall time and
+peak RSS, then compares them against a stored baseline.
+
+    python benchmarks/run.py                     # run and compare
+    python benchmarks/run.py --save-baseline     # record a new baseline
+    python benchmarks/run.py --repos 5000 --latency-ms 50 --only updates_stats
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from standin import StandIn
+from src.snapshots import SnapshotStore
+
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baseline.json"
+
+# Arguments after the interpreter; script paths are relative to the repository root
+TARGETS = {
+    "updates_stats": [".github/scripts/updates_stats.py"],
+    "update_trending": ["src/update_trending.py"],
+    "process_community_content": [".github/scripts/process_community_content.py"],
+    "visualizations": ["src/visualizations.py"],
+    "pipeline": ["-m", "src", "run"],
+}
+
+# Relative slack allowed before a metric counts as a regression. Request
+# counts are deterministic against the stand-in, so any increase is flagged.
+TOLERANCES = {
+    "requests": 0.0,
+    "bytes_sent": 0.10,
+    "wall_s": 0.25,
+    "peak_rss_kb": 0.25,
+}
+MIN_WALL_DELTA_S = 0.2  # ignore timing noise on very short runs
+STORY_WORDS = ("github repository commit branch merge review release issue fork star community open source "
+               "code project team friend learn build ship test debug deploy first pull request night weekend").split()
+
+
+def build_walls(workdir, wall_size, new_entries):
+    """Write MESSAGES.md/STORIES.md as a PR head would look, and return the PR's file patches"""
+    messages = sorted(f"- “Benchmark message {i:06d}” — @user{i}" for i in range(wall_size))
+    added_messages = [f"- “New benchmark message {i}” — @contributor{i}" for i in range(new_entries)]
+    with open(workdir / "MESSAGES.md", "w", encoding="utf-8") as f:
+        f.write("# Community Messages for the One Billionth Repo\n\n"
+                "Add your message below!  \n"
+                "_You can add a PR or comment with your congratulations, jokes, or hopes for the future._\n\n---\n\n")
+        f.write("\n".join(messages + added_messages) + "\n")
+
+    # Distinct story bodies, so the duplicate check passes them as it would real stories
+    rng = random.Random(0)
+
+    def story(i):
+        return f"by @user{i}\n\n" + " ".join(rng.choice(STORY_WORDS) for _ in range(24)) + "."
+    stories = [f"## Benchmark Story {i:06d}\n" + story(i) for i in range(wall_size)]
+    added_stories = [f"## New Benchmark Story {i}\n" + story(i) for i in range(new_entries)]
+    with open(workdir / "STORIES.md", "w", encoding="utf-8") as f:
+        f.write("# GitHub Stories\n\nShare your GitHub journey and experiences here! "
+                "Add your story with a pull request.\n\n## Guidelines\n- Include your GitHub handle\n\n---\n\n")
+        f.write("\n\n".join(stories + added_stories) + "\n")
+
+    def patch(lines):
+        return f"@@ -1,0 +1,{len(lines)} @@\n" + "\n".join("+" + line for line in lines)
+
+    story_lines = []
+    for text in added_stories:
+        story_lines.extend([""] + text.split("\n"))
+    return [
+        {"filename": "MESSAGES.md", "status": "modified", "additions": len(added_messages),
+         "deletions": 0, "changes": len(added_messages), "sha": "3" * 40, "patch": patch(added_messages)},
+        {"filename": "STORIES.md", "status": "modified", "additions": len(story_lines),
+         "deletions": 0, "changes": len(story_lines), "sha": "4" * 40, "patch": patch(story_lines)},
+    ]
+
+
+def build_snapshots(workdir, count):
+    store = SnapshotStore(str(workdir / ".github" / "stats"))
+    languages = ["Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C++"]
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        timestamp = (start + timedelta(hours=6 * i)).strftime("%Y%m%d_%H%M")
+        store.append(timestamp, {
+            "repository": {"stars": 2000 + i, "forks": 200, "issues": 400, "watchers": 2000 + i},
+            "trending": {"total_count": 0, "items": []},
+            "languages": {lang: {"count": 10 + (i + j) % 7, "stars": 100000 * (j + 1) + i * 10}
+                          for j, lang in enumerate(languages)},
+            "topics": {topic: {"total_count": 1000 * (j + 1) + i, "top_repos": []}
+                       for j, topic in enumerate(["ai", "web-development", "mobile", "devops", "security"])},
+        })
+
+
+def run_target(name, workdir, env, standin):
+    standin.reset_counters()
+    log_path = workdir / f"{name}.log"
+    start = time.perf_counter()
+    with open(log_path, "w") as log:
+        args = [str(REPO_ROOT / arg) if arg.endswith(".py") else arg for arg in TARGETS[name]]
+        process = subprocess.Popen([sys.executable] + args,
+                                   cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+        _, status, usage = os.wait4(process.pid, 0)
+    wall = time.perf_counter() - start
+    counters = standin.counters()
+    return {
+        "exit_code": os.waitstatus_to_exitcode(status),
+        "wall_s": round(wall, 3),
+        "requests": counters["requests"],
+        "bytes_sent": counters["bytes_sent"],
+        "bytes_received": counters["bytes_received"],
+        "peak_rss_kb": usage.ru_maxrss,
+        "by_endpoint": counters["by_endpoint"],
+        "log": str(log_path),
+    }
+
+
+def compare(results, baseline):
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        for metric, tolerance in TOLERANCES.items():
+            old, new = base.get(metric), result.get(metric)
+            if old is None or new is None:
+                continue
+            if metric == "wall_s" and new - old < MIN_WALL_DELTA_S:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append(f"{name}.{metric}: {old} -> {new}")
+    return regressions
+
+
+def print_table(results, baseline):
+    print(f"{'target':<28}{'exit':>5}{'requests':>10}{'bytes':>12}{'wall s':>9}{'rss MB':>8}  vs baseline")
+    for name, r in results.items():
+        base = baseline.get(name, {})
+        delta = ""
+        if base:
+            delta = f"req {r['requests'] - base.get('requests', 0):+d}, wall {r['wall_s'] - base.get('wall_s', 0):+.2f}s"
+        print(f"{name:<28}{r['exit_code']:>5}{r['requests']:>10}{r['bytes_sent']:>12}"
+              f"{r['wall_s']:>9.2f}{r['peak_rss_kb'] / 1024:>8.1f}  {delta}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline end-to-end benchmarks")
+    parser.add_argument("--only", nargs="+", choices=sorted(TARGETS), help="Run only these targets")
+    parser.add_argument("--repos", type=int, default=2000, help="Synthetic repositories served by search")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Added latency per API request")
+    parser.add_argument("--wall-size", type=int, default=1000, help="Existing messages/stories on the wall")
+    parser.add_argument("--new-entries", type=int, default=5, help="Messages/stories added by the benchmark PR")
+    parser.add_argument("--snapshots", type=int, default=500, help="Stats snapshots in the history")
+    parser.add_argument("--warm", action="store_true", help="Keep the response cache between targets")
+    parser.add_argument("--backend", choices=["rest", "graphql"], default="rest",
+                        help="GITHUB_API_BACKEND for the scripts under test")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch directory for inspection")
+    args = parser.parse_args()
+
+    config = {k: getattr(args, k) for k in ("repos", "latency_ms", "wall_size", "new_entries", "snapshots", "warm", "backend")}
+    workdir = Path(tempfile.mkdtemp(prefix="shit-bench-"))
+    for name in ("README.md", "PUBLIC_REPOS.md"):
+        shutil.copy(REPO_ROOT / name, workdir / name)
+    pr_files = build_walls(workdir, args.wall_size, args.new_entries)
+    build_snapshots(workdir, args.snapshots)
+
+    standin = StandIn(repos=args.repos, latency_ms=args.latency_ms, pr_files=pr_files).start()
+    for name in ("MESSAGES.md", "STORIES.md"):
+        standin.contents[name] = (workdir / name).read_text(encoding="utf-8")
+    env = dict(os.environ,
+               GITHUB_API_URL=standin.url,
+               GITHUB_GRAPHQL_URL=f"{standin.url}/graphql",
+               GITHUB_API_BACKEND=args.backend,
+               GITHUB_TOKEN="benchmark-token",
+               GITHUB_REPOSITORY="bench/repo",
+               PR_NUMBER="1",
+               GITHUB_TOKEN_POOL="",
+               PYTHONPATH=str(REPO_ROOT))
+    env.pop("ACCESS_TOKEN", None)
+
+    results = {}
+    try:
+        for name in args.only or TARGETS:
+            if not args.warm:
+                shutil.rmtree(workdir / ".github" / "cache", ignore_errors=True)
+            results[name] = run_target(name, workdir, env, standin)
+    finally:
+        standin.stop()
+
+    baseline = {}
+    baseline_path = Path(args.baseline)
+    if baseline_path.exists():
+        with open(baseline_path, encoding="utf-8") as f:
+            saved = json.load(f)
+        if saved.get("config") == config:
+            baseline = saved.get("results", {})
+        else:
+            print(f"Baseline {baseline_path} was recorded with a different configuration; not comparing.")
+
+    print_table(results, baseline)
+    failed = [name for name, r in results.items() if r["exit_code"] != 0]
+    for name in failed:
+        print(f"{name} exited with {results[name]['exit_code']}; see {results[name]['log']}", file=sys.stderr)
+    regressions = compare(results, baseline)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+
+    if args.save_baseline:
+        stored = {name: {k: v for k, v in r.items() if k != "log"} for name, r in results.items()}
+        with open(baseline_path, "w", encoding="utf-8") as f:
+            json.dump({"config": config, "results": stored}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Saved baseline to {baseline_path}")
+
+    if not args.keep:
+        shutil.rmtree(workdir, ignore_errors=True)
+    else:
+        print(f"Scratch directory kept at {workdir}")
+    sys.exit(1 if failed or (regressions and not args.save_baseline) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""Local stand-in for the parts of the GitHub REST API the scripts use.
+
+Serves synthetic search, repository, issue, pull request, contents and
+GraphQL search/repository responses with a configurable result count and per-request latency, and
+counts requests and bytes so benchmark runs can be compared.
+"""
+import base64
+import json
+import random
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+SEARCH_RESULT_CAP = 1000
+LANGUAGES = ["Python", "JavaScript", "TypeScript", "Go", "Rust", "Java", "C++", None]
+TOPICS = ["ai", "web-development", "mobile", "devops", "security"]
+LOG_ISSUES = {1: "trending-repos", 2: "community-messages", 3: "community-stories"}
+
+
+def make_repos(count, seed=0):
+    """Deterministic synthetic repositories, most-starred first"""
+    rng = random.Random(seed)
+    now = datetime.now()
+    repos = []
+    for i in range(count):
+        owner, name = f"owner{i % 97}", f"repo{i}"
+        repos.append({
+            "id": i + 1,
+            "name": name,
+            "full_name": f"{owner}/{name}",
+            "html_url": f"https://github.com/{owner}/{name}",
+            "description": f"Synthetic repository {i}" if i % 5 else None,
+            "stargazers_count": int(200000 / (1 + i * 0.05)) + rng.randint(0, 50),
+            "language": LANGUAGES[i % len(LANGUAGES)],
+            "topics": [TOPICS[i % len(TOPICS)]],
+            "created_at": (now - timedelta(days=rng.randint(0, 60))).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "owner": {"login": owner},
+        })
+    repos.sort(key=lambda r: -r["stargazers_count"])
+    return repos
+
+
+def _matches(repo, term):
+    qualifier, _, value = term.partition(":")
+    if qualifier == "stars":
+        stars = repo["stargazers_count"]
+        if ".." in value:
+            low, high = value.split("..")
+            return (low in ("", "*") or stars >= int(low)) and (high in ("", "*") or stars <= int(high))
+        if value.startswith(">="):
+            return stars >= int(value[2:])
+        if value.startswith(">"):
+            return stars > int(value[1:])
+        if value.startswith("<="):
+            return stars <= int(value[2:])
+        if value.startswith("<"):
+            return stars < int(value[1:])
+        return stars == int(value)
+    if qualifier == "created":
+        created = repo["created_at"][:10]
+        if ".." in value:
+            low, high = value.split("..")
+            return (low in ("", "*") or created >= low) and (high in ("", "*") or created <= high)
+        if value.startswith(">="):
+            return created >= value[2:]
+        if value.startswith(">"):
+            return created > value[1:]
+        if value.startswith("<="):
+            return created <= value[2:]
+        if value.startswith("<"):
+            return created < value[1:]
+        return created == value
+    if qualifier == "language":
+        return (repo["language"] or "").lower() == value.lower()
+    if qualifier == "topic":
+        return value in repo["topics"]
+    return True
+
+
+class StandIn:
+    """Threaded HTTP server plus the synthetic state it serves"""
+
+    def __init__(self, repos=2000, latency_ms=0.0, pr_files=None, seed=0):
+        self.repos = make_repos(repos, seed)
+        self.latency = latency_ms / 1000.0
+        self.pr_files = pr_files or []
+        self.contents = {}
+        self.comments = []
+        self._lock = threading.Lock()
+        self.reset_counters()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self._server.server_address[1]}"
+
+    def reset_counters(self):
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.bytes_received = 0
+            self.by_endpoint = {}
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def counters(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "bytes_sent": self.bytes_sent,
+                "bytes_received": self.bytes_received,
+                "by_endpoint": dict(self.by_endpoint),
+            }
+
+    # --- synthetic resources -------------------------------------------------
+
+    def repo_json(self, full_name):
+        stars = 2862
+        return {
+            "id": 1000000000,
+            "name": full_name.split("/")[-1],
+            "full_name": full_name,
+            "url": f"{self.url}/repos/{full_name}",
+            "html_url": f"https://github.com/{full_name}",
+            "stargazers_count": stars,
+            "watchers_count": stars,
+            "forks_count": 209,
+            "open_issues_count": 407,
+            "owner": {"login": full_name.split("/")[0]},
+        }
+
+    def issue_json(self, full_name, number):
+        label = LOG_ISSUES.get(number, "misc")
+        return {
+            "number": number,
+            "id": number,
+            "state": "open",
+            "title": label.replace("-", " ").title(),
+            "url": f"{self.url}/repos/{full_name}/issues/{number}",
+            "labels": [{"name": label}],
+            "created_at": "2025-01-01T00:00:00Z",
+            "user": {"login": "bench"},
+        }
+
+    def search_repositories(self, params):
+        terms = params.get("q", "").split()
+        matches = [r for r in self.repos if all(_matches(r, t) for t in terms)]
+        per_page = min(int(params.get("per_page", 30)), 100)
+        page = int(params.get("page", 1))
+        visible = matches[:SEARCH_RESULT_CAP]
+        items = visible[(page - 1) * per_page:page * per_page]
+        links = {}
+        if page * per_page < len(visible):
+            links["next"] = f"{self.url}/search/repositories?{urlencode({**params, 'page': page + 1})}"
+        return {"total_count": len(matches), "incomplete_results": False, "items": items}, links
+
+    def search_issues(self, params):
+        wanted = set(re.findall(r'"([^"]+)"', params.get("q", "")))
+        items = [self.issue_json("bench/repo", n) for n, label in LOG_ISSUES.items() if label in wanted]
+        return {"total_count": len(items), "incomplete_results": False, "items": items}
+
+    def graphql(self, payload):
+        """Answer the aliased search/repository queries built by src.graphql_batch"""
+        query, variables = payload.get("query", ""), payload.get("variables") or {}
+        data = {}
+        for alias, q_var in re.findall(r"(\w+): search\(query: \$(\w+), type: REPOSITORY", query):
+            first = int(re.search(rf"{alias}: search\([^)]*first: (\d+)", query).group(1))
+            terms = [t for t in variables.get(q_var, "").split() if not t.startswith("sort:")]
+            matches = [r for r in self.repos if all(_matches(r, t) for t in terms)]
+            data[alias] = {
+                "repositoryCount": len(matches),
+                "nodes": [{
+                    "nameWithOwner": r["full_name"],
+                    "url": r["html_url"],
+                    "description": r["description"],
+                    "stargazerCount": r["stargazers_count"],
+                    "primaryLanguage": {"name": r["language"]} if r["language"] else None,
+                } for r in matches[:first]],
+            }
+        for alias, owner_var, name_var in re.findall(
+                r"(\w+): repository\(owner: \$(\w+), name: \$(\w+)\)", query):
+            repo = self.repo_json(f"{variables.get(owner_var)}/{variables.get(name_var)}")
+            data[alias] = {
+                "stargazerCount": repo["stargazers_count"],
+                "forkCount": repo["forks_count"],
+                "issues": {"totalCount": repo["open_issues_count"] - 7},
+                "pullRequests": {"totalCount": 7},
+            }
+        data["rateLimit"] = {"cost": 1, "remaining": 4999}
+        return {"data": data}
+
+    # --- HTTP plumbing -------------------------------------------------------
+
+    def _handler_class(self):
+        standin = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload, links=None, endpoint=None):
+                body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("X-RateLimit-Limit", "5000")
+                self.send_header("X-RateLimit-Remaining", "4999")
+                self.send_header("X-RateLimit-Reset", str(int(time.time()) + 3600))
+                if links:
+                    self.send_header("Link", ", ".join(f'<{url}>; rel="{rel}"' for rel, url in links.items()))
+                self.end_headers()
+                self.wfile.write(body)
+                with standin._lock:
+                    standin.requests += 1
+                    standin.bytes_sent += len(body)
+                    standin.by_endpoint[endpoint] = standin.by_endpoint.get(endpoint, 0) + 1
+
+            def _route(self, method):
+                if standin.latency:
+                    time.sleep(standin.latency)
+                parts = urlsplit(self.path)
+                params = dict(parse_qsl(parts.query))
+                path = parts.path
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                with standin._lock:
+                    standin.bytes_received += len(body)
+                payload = json.loads(body) if body else {}
+
+                if path == "/graphql" and method == "POST":
+                    return self._reply(200, standin.graphql(payload), endpoint="graphql")
+                if path == "/search/repositories":
+                    data, links = standin.search_repositories(params)
+                    return self._reply(200, data, links, "search/repositories")
+                if path == "/search/issues":
+                    return self._reply(200, standin.search_issues(params), endpoint="search/issues")
+                match = re.fullmatch(r"/repos/([^/]+/[^/]+)(/.*)?", path)
+                if not match:
+                    return self._reply(404, {"message": "Not Found"}, endpoint="other")
+                full_name, rest = match.group(1), match.group(2) or ""
+                if rest == "":
+                    return self._reply(200, standin.repo_json(full_name), endpoint="repos")
+                if rest.startswith("/labels/"):
+                    return self._reply(200, {"name": rest[len("/labels/"):], "color": "4caf50"}, endpoint="labels")
+                if rest == "/issues" and method == "GET":
+                    return self._reply(200, [], endpoint="issues")
+                if rest == "/issues" and method == "POST":
+                    return self._reply(201, standin.issue_json(full_name, 99), endpoint="issues")
+                issue = re.fullmatch(r"/issues/(\d+)(/comments)?", rest)
+                if issue and issue.group(2) and method == "POST":
+                    with standin._lock:
+                        standin.comments.append(payload.get("body", ""))
+                    return self._reply(201, {"id": len(standin.comments), "body": payload.get("body", "")},
+                                       endpoint="comments")
+                if issue:
+                    return self._reply(200, standin.issue_json(full_name, int(issue.group(1))), endpoint="issues")
+                pull = re.fullmatch(r"/pulls/(\d+)(/files)?", rest)
+                if pull and pull.group(2):
+                    return self._reply(200, standin.pr_files if int(params.get("page", 1)) == 1 else [],
+                                       endpoint="pulls/files")
+                if pull:
+                    number = int(pull.group(1))
+                    return self._reply(200, {
+                        "number": number,
+                        "id": number,
+                        "url": f"{standin.url}/repos/{full_name}/pulls/{number}",
+                        "user": {"login": "bench"},
+                        "head": {"sha": "0" * 40, "ref": "bench"},
+                        "base": {"sha": "1" * 40, "ref": "main"},
+                    }, endpoint="pulls")
+                if rest.startswith("/contents/"):
+                    name = rest[len("/contents/"):]
+                    content = standin.contents.get(name, "")
+                    return self._reply(200, {
+                        "type": "file",
+                        "name": name,
+                        "path": name,
+                        "encoding": "base64",
+                        "content": base64.b64encode(content.encode("utf-8")).decode("ascii"),
+                        "sha": "2" * 40,
+                        "url": f"{standin.url}/repos/{full_name}/contents/{name}",
+                    }, endpoint="contents")
+                return self._reply(404, {"message": "Not Found"}, endpoint="other")
+
+            def do_GET(self):
+                self._route("GET")
+
+            def do_POST(self):
+                self._route("POST")
+
+            def do_PATCH(self):
+                self._route("PATCH")
+
+        return Handler
@@ -0,0 +1,156 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+DEFAULT_CACHE_PATH = ".github/cache/http_cache.sqlite"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Seconds an entry is served without contacting GitHub, matched by endpoint
+# prefix (longest prefix wins). Stale entries are still kept and revalidated
+# with If-None-Match / If-Modified-Since, which GitHub answers with a cheap 304.
+DEFAULT_TTLS = {
+    "/search/": 30 * 60,
+    "/repos/": 10 * 60,
+    "": 5 * 60,
+}
+
+
+def make_cache_key(endpoint: str, params: Dict = None) -> str:
+    """Build a stable key from an endpoint and its query parameters"""
+    normalized = {}
+    for name, value in (params or {}).items():
+        if value is None:
+            continue
+        value = str(value).strip()
+        if name == "q":
+            # Search qualifiers are order-independent, so "a b" and "b  a" share a key
+            value = " ".join(sorted(value.split()))
+        normalized[name] = value
+    return f"{endpoint}?{json.dumps(normalized, sort_keys=True)}"
+
+
+class ResponseCache:
+    """SQLite-backed response cache with per-endpoint TTLs and LRU eviction.
+
+    Any object exposing ``lookup``, ``store`` and ``refresh`` with the same
+    signatures can be handed to ``GitHubAPI`` instead.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES,
+                 ttls: Dict[str, int] = None):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                body BLOB NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL,
+                size INTEGER NOT NULL,
+                links TEXT
+            )"""
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(responses)")}
+        if "links" not in columns:
+            self._conn.execute("ALTER TABLE responses ADD COLUMN links TEXT")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_lru ON responses (accessed_at)")
+        self._conn.commit()
+
+    def ttl_for(self, endpoint: str) -> int:
+        prefixes = [p for p in self.ttls if endpoint.startswith(p)]
+        if not prefixes:
+            return 0
+        return self.ttls[max(prefixes, key=len)]
+
+    def lookup(self, endpoint: str, key: str) -> Optional[Dict]:
+        """Return the cached entry for ``key`` with a ``fresh`` flag, or None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, stored_at, links FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            now = time.time()
+            self._conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        body, etag, last_modified, stored_at, links = row
+        return {
+            "data": json.loads(body),
+            "links": json.loads(links) if links else {},
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresh": now - stored_at < self.ttl_for(endpoint),
+        }
+
+    def store(self, endpoint: str, key: str, data, etag: str = None, last_modified: str = None,
+              links: Dict[str, str] = None):
+        body = json.dumps(data, separators=(",", ":")).encode("utf-8")
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, endpoint, body, etag, last_modified, stored_at, accessed_at, size, links) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, endpoint, body, etag, last_modified, now, now, len(body),
+                 json.dumps(links) if links else None)
+            )
+            self._evict()
+            self._conn.commit()
+
+    def refresh(self, key: str):
+        """Mark an entry as fresh again after a 304 revalidation"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?",
+                (now, now, key)
+            )
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+
+_shared_cache = None
+
+
+def get_shared_cache() -> Optional[ResponseCache]:
+    """Return the process-wide cache, configured by GITHUB_API_CACHE.
+
+    Set GITHUB_API_CACHE to a file path to relocate the cache, or to "off"
+    to disable caching entirely.
+    """
+    global _shared_cache
+    path = os.getenv("GITHUB_API_CACHE", DEFAULT_CACHE_PATH)
+    if path.lower() in ("", "off", "0", "false"):
+        return None
+    if _shared_cache is None or _shared_cache.path != path:
+        _shared_cache = ResponseCache(path)
+    return _shared_cache
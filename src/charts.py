@@ -0,0 +1,146 @@
+"""Chart rendering stage: renders chart specs in a process pool, skipping unchanged ones.
+
+A spec is a plain dict, so it can be sent to a worker process:
+
+    {"path": "languages/python.html", "title": ..., "y_title": ...,
+     "kind": "line", "series": [(label, start, end), ...]}   # rows of the series table
+    {"path": "topic_popularity.html", "title": ..., "y_title": ...,
+     "kind": "bar", "x": [...], "y": [...]}
+
+Workers memory-map the series table written by src.series_table once and
+slice out the rows of each series, so the dataset is shared rather than
+pickled per chart. Every chart loads one shared plotly.min.js from the output
+directory instead of embedding its own 3-4 MB copy.
+"""
+import hashlib
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+import plotly
+import plotly.graph_objects as go
+from plotly.offline import get_plotlyjs
+
+from src.downsample import DEFAULT_POINT_BUDGET, downsample
+from src.series_table import fingerprint, open_series_table, read_series
+
+PLOTLYJS_ASSET = "plotly.min.js"
+FINGERPRINT_FILE = ".fingerprints.json"
+CHART_VERSION = 1  # bump to re-render every chart after changing how charts are drawn
+
+_table = None
+
+
+def _init_worker(table_path: str):
+    global _table
+    _table = open_series_table(table_path)
+
+
+def render_chart(spec: Dict, output_dir: str, points: int) -> str:
+    """Render one spec to ``output_dir/spec["path"]`` (runs inside a worker)"""
+    path = Path(output_dir) / spec["path"]
+    fig = go.Figure()
+    if spec["kind"] == "bar":
+        fig.add_trace(go.Bar(x=spec["x"], y=spec["y"]))
+    else:
+        for label, start, end in spec["series"]:
+            series = downsample(read_series(_table, start, end), points)
+            fig.add_trace(go.Scatter(x=series.index, y=series.to_numpy(), mode="lines", name=label))
+    fig.update_layout(title=spec["title"], xaxis_title=spec.get("x_title"), yaxis_title=spec.get("y_title"))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    asset = os.path.relpath(Path(output_dir) / PLOTLYJS_ASSET, path.parent)
+    fig.write_html(str(path), include_plotlyjs=asset)
+    return spec["path"]
+
+
+def chart_fingerprint(spec: Dict, table, points: int) -> str:
+    """Hash of everything a chart is drawn from: the spec, its series rows and the settings.
+
+    Series are hashed by label and row content, not by their (start, end)
+    offsets, which move whenever an earlier series in the table changes length.
+    """
+    rest = {key: value for key, value in spec.items() if key != "series"}
+    series = [(label, fingerprint(table, start, end)) for label, start, end in spec.get("series", [])]
+    return hashlib.sha1(json.dumps([CHART_VERSION, points, rest, series], sort_keys=True,
+                                   default=str).encode("utf-8")).hexdigest()
+
+
+def ensure_plotlyjs(output_dir: Path, fingerprints: Dict) -> bool:
+    """Write the shared plotly.js bundle if it is missing or from another plotly version"""
+    asset = output_dir / PLOTLYJS_ASSET
+    if asset.exists() and fingerprints.get(PLOTLYJS_ASSET) == plotly.__version__:
+        return False
+    output_dir.mkdir(parents=True, exist_ok=True)
+    asset.write_text(get_plotlyjs(), encoding="utf-8")
+    fingerprints[PLOTLYJS_ASSET] = plotly.__version__
+    return True
+
+
+def _pool_context():
+    # Workers are forked from a clean server process, never from a caller that
+    # may be running other threads (such as the pipeline's parallel jobs)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["src.charts"])
+        return context
+    return multiprocessing.get_context("spawn")
+
+
+def render_charts(specs: List[Dict], table_path: str, output_dir: str,
+                  points: int = DEFAULT_POINT_BUDGET, workers: int = None) -> Dict[str, int]:
+    """Render the specs whose inputs changed since the last run, in parallel.
+
+    Returns counts of charts rendered, skipped as unchanged and failed.
+    """
+    output_dir = Path(output_dir)
+    fingerprint_path = output_dir / FINGERPRINT_FILE
+    try:
+        with open(fingerprint_path, "r", encoding="utf-8") as f:
+            fingerprints = json.load(f)
+    except (OSError, ValueError):
+        fingerprints = {}
+    ensure_plotlyjs(output_dir, fingerprints)
+
+    table = open_series_table(table_path)
+    todo = []
+    for spec in specs:
+        current = chart_fingerprint(spec, table, points)
+        if fingerprints.get(spec["path"]) != current or not (output_dir / spec["path"]).exists():
+            todo.append((spec, current))
+
+    failed = 0
+    workers = min(workers or os.cpu_count() or 1, len(todo))
+    if workers <= 1:
+        _init_worker(table_path)
+        results = []
+        for spec, _ in todo:
+            try:
+                results.append(render_chart(spec, str(output_dir), points))
+            except Exception as e:
+                print(f"Error rendering {spec['path']}: {e}", file=sys.stderr)
+                results.append(None)
+    else:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                 initializer=_init_worker, initargs=(str(table_path),)) as pool:
+            futures = [pool.submit(render_chart, spec, str(output_dir), points) for spec, _ in todo]
+            results = []
+            for (spec, _), future in zip(todo, futures):
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    print(f"Error rendering {spec['path']}: {e}", file=sys.stderr)
+                    results.append(None)
+
+    for (spec, current), result in zip(todo, results):
+        if result is None:
+            failed += 1
+            fingerprints.pop(spec["path"], None)
+        else:
+            fingerprints[spec["path"]] = current
+    with open(fingerprint_path, "w", encoding="utf-8") as f:
+        json.dump(fingerprints, f, indent=2, sort_keys=True)
+    return {"rendered": len(todo) - failed, "unchanged": len(specs) - len(todo), "failed": failed}
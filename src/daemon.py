@@ -0,0 +1,209 @@
+"""Long-running mode: the pipeline jobs on their own intervals, in one warm process.
+
+    python -m src daemon                                   # default intervals
+    python -m src daemon --every stats=600 --every viz=3600 --port 8787
+
+The GitHubAPI client (HTTP sessions, response cache, rate-limit budget), the
+star index and the chart libraries stay loaded between runs, so a refresh
+costs its API calls and little else. The response cache's TTLs are capped
+below the intervals of the jobs that call the API, so each of their ticks
+revalidates what it reads instead of re-serving the previous tick's answers. When each job last ran and is next due
+is kept in STATE_PATH, so a restart resumes the schedule rather than running
+every job at once. ``GET /healthz`` and ``GET /status`` on 127.0.0.1 report on
+it.
+"""
+import json
+import os
+import random
+import signal
+import threading
+import time
+from dataclasses import asdict, dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from src.cache import get_shared_cache
+from src.github_api import GitHubAPI
+from src.http_client import github_token
+from src.metrics import get_metrics
+from src.pipeline import JOBS, RunContext, run
+from src.star_index import StarIndex
+
+STATE_PATH = ".github/cache/daemon_state.json"
+DEFAULT_INTERVALS = {
+    'stats': 10 * 60,
+    'trending': 10 * 60,
+    'viz': 60 * 60,
+    'compact': 24 * 60 * 60,
+}
+API_JOBS = ('stats', 'trending')  # the jobs whose ticks should see fresh API data
+STALE_AFTER = 3      # /healthz fails once a job has not succeeded for this many intervals
+MAX_SLEEP = 60       # wake at least this often, so a stop request is never kept waiting long
+
+
+@dataclass
+class Schedule:
+    interval: float
+    next_run: float = 0.0
+    last_run: Optional[float] = None
+    last_ok: Optional[float] = None
+    last_outcome: Optional[str] = None
+    runs: int = 0
+    failures: int = 0
+
+
+def capped_ttls(ttls: Dict[str, float], intervals: Dict[str, float]) -> Dict[str, float]:
+    """``ttls`` with none longer than half the shortest interval of API_JOBS"""
+    intervals = [intervals[name] for name in API_JOBS if name in intervals]
+    if not intervals:
+        return dict(ttls)
+    cap = min(intervals) / 2
+    return {prefix: min(ttl, cap) for prefix, ttl in ttls.items()}
+
+
+def parse_intervals(specs: List[str]) -> Dict[str, float]:
+    """DEFAULT_INTERVALS overridden by ``job=seconds`` items"""
+    intervals = dict(DEFAULT_INTERVALS)
+    for spec in specs:
+        name, _, seconds = spec.partition('=')
+        if name not in JOBS or not seconds:
+            raise ValueError(f"Expected JOB=SECONDS with JOB one of {', '.join(JOBS)}, got '{spec}'")
+        intervals[name] = float(seconds)
+    return intervals
+
+
+class Daemon:
+    def __init__(self, intervals: Dict[str, float], jitter: float = 0.1, max_workers: int = 4,
+                 state_path: str = STATE_PATH):
+        self.jitter = jitter
+        self.max_workers = max_workers
+        self.state_path = Path(state_path)
+        self.started_at = time.time()
+        self.running: List[str] = []
+        self.schedules = {name: Schedule(interval) for name, interval in intervals.items()}
+        self._load_state()
+        # Created once and reused by every run
+        self.token = github_token()
+        cache = get_shared_cache()
+        if cache:
+            cache.ttls = capped_ttls(cache.ttls, intervals)
+        self.api = GitHubAPI(self.token)
+        self.index = StarIndex()
+
+    def _load_state(self):
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return
+        for name, fields in saved.get('jobs', {}).items():
+            if name in self.schedules:
+                fields.pop('interval', None)  # the command line decides the intervals
+                for key, value in fields.items():
+                    if hasattr(self.schedules[name], key):
+                        setattr(self.schedules[name], key, value)
+
+    def _save_state(self):
+        self.state_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.state_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'jobs': {name: asdict(s) for name, s in self.schedules.items()}}, f, indent=2)
+        os.replace(tmp_path, self.state_path)
+
+    def due(self, now: float) -> List[str]:
+        return [name for name, s in self.schedules.items() if s.next_run <= now]
+
+    def tick(self, names: List[str]):
+        """Run the due jobs as one pipeline run, then schedule each one's next run"""
+        get_metrics().reset()
+        self.running = names
+        ctx = RunContext(self.token, api=self.api, index=self.index)
+        try:
+            outcome = run(names, max_workers=self.max_workers, ctx=ctx)
+        finally:
+            self.running = []
+        now = time.time()
+        for name in names:
+            s = self.schedules[name]
+            s.runs += 1
+            s.last_run = now
+            s.last_outcome = outcome.get(name, 'failed')
+            if s.last_outcome == 'ok':
+                s.last_ok = now
+            else:
+                s.failures += 1
+            s.next_run = now + s.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        self._save_state()
+
+    def healthy(self) -> bool:
+        now = time.time()
+        return all(now - (s.last_ok or self.started_at) <= STALE_AFTER * s.interval
+                   for s in self.schedules.values())
+
+    def status(self) -> Dict:
+        return {
+            'healthy': self.healthy(),
+            'started_at': self.started_at,
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'running': list(self.running),
+            'jobs': {name: asdict(s) for name, s in self.schedules.items()},
+            'rate_limit_remaining': get_metrics().summary()['rate_limit_remaining'],
+        }
+
+    def serve(self, stop: threading.Event):
+        """Run due jobs until ``stop`` is set"""
+        while not stop.is_set():
+            now = time.time()
+            names = self.due(now)
+            if names:
+                print(f"Running {', '.join(names)}")
+                self.tick(names)
+                continue
+            wake = min(s.next_run for s in self.schedules.values())
+            stop.wait(min(max(wake - now, 0), MAX_SLEEP))
+
+
+def _status_handler(daemon: Daemon):
+    class StatusHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/healthz':
+                healthy = daemon.healthy()
+                self._reply(200 if healthy else 503, {'healthy': healthy})
+            elif self.path == '/status':
+                self._reply(200, daemon.status())
+            else:
+                self._reply(404, {'error': 'not found'})
+
+        def _reply(self, status, body):
+            data = json.dumps(body, indent=2).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StatusHandler
+
+
+def run_daemon(intervals: Dict[str, float], jitter: float = 0.1, port: int = 8787, max_workers: int = 4):
+    daemon = Daemon(intervals, jitter=jitter, max_workers=max_workers)
+    stop = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stop.set())
+
+    server = None
+    if port:
+        server = ThreadingHTTPServer(('127.0.0.1', port), _status_handler(daemon))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        print(f"Status on http://127.0.0.1:{port}/status")
+    try:
+        daemon.serve(stop)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+        print("Daemon stopped")
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+# Rollups from finest to coarsest, as pandas resample frequencies
+ROLLUPS = {"hourly": "h", "daily": "D", "weekly": "W"}
+# A rollup is used when it has at most this many times the point budget; LTTB
+# then picks the budgeted points from it, so it has some detail to choose from
+OVERSAMPLE = 4
+DEFAULT_POINT_BUDGET = 300
+
+
+def rollup(series: pd.Series, resolution: str) -> pd.Series:
+    """Mean of ``series`` (indexed by datetime) per hourly, daily or weekly bucket"""
+    return series.resample(ROLLUPS[resolution]).mean().dropna()
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps to draw ``y`` over ``x``.
+
+    The first and last points are always kept; every bucket in between keeps
+    the point forming the largest triangle with the previously kept point and
+    the next bucket's average, which preserves peaks and dips.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=int)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        kept[i + 1] = a
+    return kept
+
+
+def downsample(series: pd.Series, budget: int = DEFAULT_POINT_BUDGET) -> pd.Series:
+    """At most ``budget`` points of ``series``, whatever its length.
+
+    Uses the finest rollup with at most OVERSAMPLE x budget buckets, then LTTB.
+    """
+    series = series.sort_index()
+    for resolution in ROLLUPS:
+        rolled = rollup(series, resolution)
+        if len(rolled) <= budget * OVERSAMPLE:
+            break
+    if len(rolled) <= budget:
+        return rolled
+    x = rolled.index.asi8.astype(float)
+    return rolled.iloc[lttb(x, rolled.to_numpy(), budget)]
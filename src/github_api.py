@@ -1,15 +1,120 @@
+import json
+import os
+import time
 import requests
-from typing import Dict, List
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlsplit
 from datetime import datetime, timedelta
 
+from src.cache import get_shared_cache, make_cache_key
+from src.graphql_batch import build_query, repository_lookup, shape_result, split_batches, topic_lookup
+from src.http_client import http_get, http_post
+from src.metrics import get_metrics
+from src.models import Repo
+from src.rate_limit import RateLimitScheduler, resource_for
+
+MAX_RATE_LIMIT_RETRIES = 3
+DEFAULT_MAX_CONCURRENCY = 8
+SEARCH_RESULT_CAP = 1000  # GitHub never returns more than this many results per search
+SINCE_WINDOWS = ["daily", "weekly", "monthly"]  # narrowest to widest
+
+
+@dataclass
+class SearchView:
+    """One result a run needs, derived locally from a shared superset search.
+
+    ``kind`` is "top" (the ``limit`` most-starred matching repos, shaped like a
+    search response) or "languages" (a rollup shaped like get_language_stats).
+    """
+    name: str
+    kind: str = "top"
+    since: Optional[str] = None
+    language: Optional[str] = None
+    min_stars: int = 0
+    limit: int = 10
+
+    def matches(self, repo: Repo, created_after: Optional[str]) -> bool:
+        if self.language and (repo.language or "").lower() != self.language.lower():
+            return False
+        # min_stars=0 means no star filter (as in get_trending_repos), so 0-star repos match
+        if self.min_stars > 0 and repo.stargazers_count <= self.min_stars:
+            return False
+        if created_after and (repo.created_at or "")[:10] <= created_after:
+            return False
+        return True
+
+
+def trending_view(name: str, since: str = "daily", language: str = None, limit: int = 10) -> SearchView:
+    """View equivalent to get_trending_repos(language, since) truncated to ``limit``"""
+    return SearchView(name, "top", since=since, language=language, limit=limit)
+
+
+def starred_view(name: str, language: str = None, limit: int = 10) -> SearchView:
+    """View equivalent to get_most_starred_repos(language, limit)"""
+    return SearchView(name, "top", language=language, min_stars=1000, limit=limit)
+
+
+def language_rollup_view(name: str, since: str = None, min_stars: int = 100) -> SearchView:
+    """View equivalent to get_language_stats, optionally over recently created repos only"""
+    return SearchView(name, "languages", since=since, min_stars=min_stars)
+
+
+def plan_searches(views: List[SearchView], date_filter: Callable[[str], str]) -> List[Dict]:
+    """Group views into the fewest star-sorted searches that contain all of them.
+
+    Views with a ``since`` window share one ``created:>`` search over the widest
+    window; the rest share one ``stars:>`` search over the lowest threshold.
+    Language and star filters are always applied locally.
+    """
+    groups = {}
+    for view in views:
+        groups.setdefault(view.since is not None, []).append(view)
+
+    plans = []
+    for windowed, group in groups.items():
+        terms = []
+        created_after = None
+        if windowed:
+            widest = max((v.since for v in group), key=lambda w: SINCE_WINDOWS.index(w) if w in SINCE_WINDOWS else -1)
+            created_after = date_filter(widest)
+            terms.append(f"created:>{created_after}")
+        min_stars = min(v.min_stars for v in group)
+        if min_stars > 0 or not terms:
+            terms.append(f"stars:>{min_stars}")
+        plans.append({
+            "q": " ".join(terms),
+            "views": group,
+            "created_after": {v.name: date_filter(v.since) if v.since else None for v in group},
+        })
+    return plans
+
+
 class GitHubAPI:
-    def __init__(self, token: str = None):
-        self.base_url = "https://api.github.com"
+    def __init__(self, token: str = None, cache=None, tokens: List[str] = None, backend: str = None):
+        # GITHUB_API_URL is set by GitHub Actions (and GHES), and lets benchmarks use a local stand-in
+        self.base_url = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+        self.graphql_url = os.getenv("GITHUB_GRAPHQL_URL") or (
+            self.base_url[:-len("/v3")] if self.base_url.endswith("/v3") else self.base_url
+        ) + "/graphql"
         self.headers = {
             "Accept": "application/vnd.github.v3+json"
         }
-        if token:
-            self.headers["Authorization"] = f"token {token}"
+        # Requests are spread over a pool of tokens; extra tokens can be supplied
+        # via the comma-separated GITHUB_TOKEN_POOL environment variable
+        if tokens is None:
+            tokens = [t.strip() for t in os.getenv("GITHUB_TOKEN_POOL", "").split(",") if t.strip()]
+        pool = list(tokens)
+        if token and token not in pool:
+            pool.insert(0, token)
+        self.scheduler = RateLimitScheduler(pool)
+        # "graphql" batches topic and repository lookups into aliased queries;
+        # it needs a token, so anonymous clients always use REST
+        backend = backend or os.getenv("GITHUB_API_BACKEND", "rest")
+        self.backend = backend if pool else "rest"
+        # cache=None uses the shared on-disk cache, cache=False disables caching
+        self.cache = get_shared_cache() if cache is None else (cache or None)
     
     def _get_date_filter(self, since: str) -> str:
         today = datetime.now()
@@ -30,8 +135,16 @@ class GitHubAPI:
         if language:
             params["q"] += f" language:{language}"
             
-        return self._make_request("/search/repositories", params)
+        return self._search_page(params)
     
+    def iter_trending_repos(self, language: str = None, since: str = "daily",
+                            max_items: int = SEARCH_RESULT_CAP) -> Iterator[Dict]:
+        """Stream the same results as get_trending_repos across all pages"""
+        q = f"created:>{self._get_date_filter(since)}"
+        if language:
+            q += f" language:{language}"
+        return self.iter_search(q, sort="stars", max_items=max_items)
+
     def get_most_starred_repos(self, language: str = None, limit: int = 10) -> List[Dict]:
         params = {
             "q": "stars:>1000",
@@ -42,41 +155,336 @@ class GitHubAPI:
         if language:
             params["q"] += f" language:{language}"
         
-        return self._make_request("/search/repositories", params)
+        return self._search_page(params)
     
-    def get_language_stats(self) -> Dict:
+    def get_language_stats(self, max_items: int = SEARCH_RESULT_CAP) -> Dict:
         """Get statistics about programming languages on GitHub"""
-        params = {"q": "stars:>100", "per_page": 100}
-        repos = self._make_request("/search/repositories", params)
         languages = {}
-        
-        for repo in repos.get("items", []):
-            lang = repo.get("language")
+
+        for repo in self.iter_search("stars:>100", max_items=max_items):
+            lang = repo.language
             if lang:
                 if lang not in languages:
                     languages[lang] = {"count": 0, "stars": 0}
                 languages[lang]["count"] += 1
-                languages[lang]["stars"] += repo.get("stargazers_count", 0)
+                languages[lang]["stars"] += repo.stargazers_count
         
         return languages
     
+    def search_count(self, q: str) -> int:
+        """Total number of repositories matching ``q``, from a one-result search"""
+        return self._make_request("/search/repositories", {"q": q, "per_page": 1}).get("total_count", 0)
+
+    def iter_search(self, q: str, sort: str = None, max_items: int = SEARCH_RESULT_CAP,
+                    order: str = "desc") -> Iterator[Repo]:
+        """Yield repositories matching ``q`` one at a time, following ``Link: rel="next"``.
+
+        Only the current page is held in memory; the next one is fetched in the
+        background while the caller consumes the current one.
+        """
+        max_items = min(max_items, SEARCH_RESULT_CAP)
+        if max_items <= 0:
+            return
+        params = {"q": q, "per_page": min(100, max_items)}
+        if sort:
+            params["sort"] = sort
+            params["order"] = order
+
+        yielded = 0
+        prefetcher = ThreadPoolExecutor(max_workers=1)
+        try:
+            page = prefetcher.submit(self._request, "/search/repositories", params)
+            while page is not None:
+                data, links = page.result()
+                next_url = links.get("next")
+                items = data.get("items", [])
+                page = None
+                if next_url and yielded + len(items) < max_items:
+                    page = prefetcher.submit(self._request, *self._split_link(next_url))
+                for item in items:
+                    yield Repo.from_api(item)
+                    yielded += 1
+                    if yielded >= max_items:
+                        return
+        finally:
+            prefetcher.shutdown(wait=False, cancel_futures=True)
+
+    def _split_link(self, url: str) -> Tuple[str, Dict]:
+        """Turn an absolute pagination URL back into (endpoint, params)"""
+        parts = urlsplit(url)
+        base_path = urlsplit(self.base_url).path.rstrip("/")
+        endpoint = parts.path[len(base_path):] if parts.path.startswith(base_path) else parts.path
+        return endpoint, dict(parse_qsl(parts.query))
+
+    def get_views(self, views: List[SearchView], max_items: int = SEARCH_RESULT_CAP) -> Dict[str, Dict]:
+        """Compute several trending/starred/language views from as few searches as possible.
+
+        Each planned search is streamed once, sorted by stars, and every repo is
+        offered to every view in its group. Streaming stops as soon as all "top"
+        views are full and no rollup still needs data. A "top" view left short
+        because its superset hit the result cap falls back to its own search.
+        """
+        results = {}
+        for plan in plan_searches(views, self._get_date_filter):
+            group = plan["views"]
+            tops = {v.name: [] for v in group if v.kind == "top"}
+            rollups = {v.name: {} for v in group if v.kind == "languages"}
+            seen = 0
+            for repo in self.iter_search(plan["q"], sort="stars", max_items=max_items):
+                seen += 1
+                for view in group:
+                    if not view.matches(repo, plan["created_after"][view.name]):
+                        continue
+                    if view.kind == "top":
+                        if len(tops[view.name]) < view.limit:
+                            tops[view.name].append(repo)
+                    else:
+                        lang = repo.language
+                        if lang:
+                            stats = rollups[view.name].setdefault(lang, {"count": 0, "stars": 0})
+                            stats["count"] += 1
+                            stats["stars"] += repo.stargazers_count
+                if not rollups and all(len(tops[v.name]) >= v.limit for v in group):
+                    break
+
+            truncated = seen >= min(max_items, SEARCH_RESULT_CAP)
+            for view in group:
+                if view.kind == "languages":
+                    results[view.name] = rollups[view.name]
+                    continue
+                items = tops[view.name]
+                if truncated and len(items) < view.limit:
+                    items = list(self.iter_search(self._view_query(view), sort="stars", max_items=view.limit))
+                results[view.name] = {"total_count": len(items), "items": items}
+        return results
+
+    def _view_query(self, view: SearchView) -> str:
+        terms = []
+        if view.since:
+            terms.append(f"created:>{self._get_date_filter(view.since)}")
+        if view.min_stars > 0:
+            terms.append(f"stars:>{view.min_stars}")
+        if view.language:
+            terms.append(f"language:{view.language}")
+        return " ".join(terms) or "stars:>0"
+
     def get_topic_stats(self, topics: List[str]) -> Dict:
         """Get statistics about specific topics on GitHub"""
+        if self.backend == "graphql":
+            topic_stats, _, errors = self.get_batch_stats(topics)
+            if errors:
+                raise next(iter(errors.values()))
+            return topic_stats
         result = {}
         for topic in topics:
-            params = {"q": f"topic:{topic}", "sort": "stars", "order": "desc"}
-            data = self._make_request("/search/repositories", params)
-            result[topic] = {
-                "total_count": data.get("total_count", 0),
-                "top_repos": data.get("items", [])[:5]
-            }
+            result[topic] = self._get_single_topic_stats(topic)
         return result
 
+    def _get_single_topic_stats(self, topic: str) -> Dict:
+        params = {"q": f"topic:{topic}", "sort": "stars", "order": "desc"}
+        data = self._make_request("/search/repositories", params)
+        return {
+            "total_count": data.get("total_count", 0),
+            "top_repos": [Repo.from_api(item) for item in data.get("items", [])[:5]]
+        }
+
+    def get_topic_stats_concurrent(self, topics: List[str],
+                                   max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Tuple[Dict, Dict]:
+        """Like get_topic_stats, but fetches topics on a bounded thread pool.
+
+        Returns ``(stats, errors)``: stats for every topic that succeeded, in
+        input order, and the exception raised for every topic that failed.
+        """
+        if self.backend == "graphql":
+            topic_stats, _, errors = self.get_batch_stats(topics)
+            return topic_stats, errors
+        return self._fan_out(self._get_single_topic_stats, topics, max_concurrency)
+
+    def get_repo_stats(self, full_name: str) -> Dict:
+        """Star, fork, open issue and watcher counters of one repository"""
+        if self.backend == "graphql":
+            _, repo_stats, errors = self.get_batch_stats(repos=[full_name])
+            if errors:
+                raise next(iter(errors.values()))
+            return repo_stats[full_name]
+        data = self._make_request(f"/repos/{full_name}")
+        return {
+            "stars": data.get("stargazers_count", 0),
+            "forks": data.get("forks_count", 0),
+            "issues": data.get("open_issues_count", 0),
+            "watchers": data.get("watchers_count", 0),
+        }
+
+    def get_batch_stats(self, topics: List[str] = (), repos: List[str] = (),
+                        max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Tuple[Dict, Dict, Dict]:
+        """Topic stats and repository counters together, as ``(topic_stats, repo_stats, errors)``.
+
+        With the GraphQL backend every lookup is packed into as few aliased
+        queries as the batch cost limit allows; with REST this is one request
+        per topic and per repository. ``errors`` maps a topic or repository
+        name to the exception that prevented its lookup.
+        """
+        topics, repos = list(dict.fromkeys(topics)), list(dict.fromkeys(repos))
+        if self.backend != "graphql":
+            topic_stats, errors = self._fan_out(self._get_single_topic_stats, topics, max_concurrency)
+            repo_stats, repo_errors = self._fan_out(self.get_repo_stats, repos, max_concurrency)
+            return topic_stats, repo_stats, {**errors, **repo_errors}
+
+        lookups = [topic_lookup(t) for t in topics] + [repository_lookup(r) for r in repos]
+        batches = split_batches(lookups)
+        shaped, batch_errors = self._fan_out(lambda i: self._run_batch(batches[i]), range(len(batches)),
+                                             max_concurrency)
+        results, errors = {}, {}
+        for i, batch in enumerate(batches):
+            if i in batch_errors:
+                errors.update({lookup.key: batch_errors[i] for lookup in batch})
+            else:
+                results.update(shaped[i][0])
+                errors.update(shaped[i][1])
+        topic_stats = {t: results[t] for t in topics if t in results}
+        repo_stats = {r: results[r] for r in repos if r in results}
+        return topic_stats, repo_stats, errors
+
+    def _run_batch(self, batch) -> Tuple[Dict, Dict]:
+        """Run one batched query, returning (results, errors) keyed by lookup key"""
+        query, variables = build_query(batch)
+        payload = self._graphql(query, variables)
+        data = payload.get("data") or {}
+        failed = {}
+        for error in payload.get("errors") or []:
+            alias = (error.get("path") or [None])[0]
+            failed.setdefault(alias, RuntimeError(error.get("message", "GraphQL error")))
+        results, errors = {}, {}
+        for i, lookup in enumerate(batch):
+            alias = f"l{i}"
+            if data.get(alias) is None:
+                errors[lookup.key] = failed.get(alias) or failed.get(None) or RuntimeError(f"No data for {lookup.key}")
+            else:
+                results[lookup.key] = shape_result(lookup, data[alias])
+        return results, errors
+
+    def get_trending_repos_concurrent(self, languages: List[str], since: str = "daily",
+                                      max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Tuple[Dict, Dict]:
+        """Run get_trending_repos for each language concurrently, see get_topic_stats_concurrent"""
+        return self._fan_out(lambda lang: self.get_trending_repos(lang, since), languages, max_concurrency)
+
+    def get_most_starred_repos_concurrent(self, languages: List[str], limit: int = 10,
+                                          max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Tuple[Dict, Dict]:
+        """Run get_most_starred_repos for each language concurrently, see get_topic_stats_concurrent"""
+        return self._fan_out(lambda lang: self.get_most_starred_repos(lang, limit), languages, max_concurrency)
+
+    def _fan_out(self, fetch: Callable[[str], Dict], keys: List[str], max_concurrency: int) -> Tuple[Dict, Dict]:
+        # The rate-limit scheduler is shared by all workers, so extra threads only
+        # help while there is budget left; they never push us into a 403
+        keys = list(dict.fromkeys(keys))
+        results, errors = {}, {}
+        if not keys:
+            return results, errors
+        with ThreadPoolExecutor(max_workers=max(1, min(max_concurrency, len(keys)))) as pool:
+            futures = [(key, pool.submit(fetch, key)) for key in keys]
+            for key, future in futures:
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    errors[key] = e
+        return results, errors
+
+    def _search_page(self, params: Dict) -> Dict:
+        """One page of repository search results, with the items projected to Repo"""
+        data = self._make_request("/search/repositories", params)
+        return {
+            "total_count": data.get("total_count", 0),
+            "items": [Repo.from_api(item) for item in data.get("items", [])]
+        }
+
     def _make_request(self, endpoint: str, params: Dict = None) -> Dict:
-        response = requests.get(
-            f"{self.base_url}{endpoint}",
-            headers=self.headers,
-            params=params
+        return self._request(endpoint, params)[0]
+
+    def _request(self, endpoint: str, params: Dict = None) -> Tuple[Dict, Dict[str, str]]:
+        """Fetch ``endpoint`` and return its JSON body and its ``Link`` header as {rel: url}"""
+        headers = dict(self.headers)
+        cached = None
+        metrics = get_metrics()
+        if self.cache:
+            key = make_cache_key(endpoint, params)
+            cached = self.cache.lookup(endpoint, key)
+            if cached and cached["fresh"]:
+                metrics.record_request(endpoint, None, 0.0, 0, "hit")
+                return cached["data"], cached["links"]
+            if cached:
+                if cached["etag"]:
+                    headers["If-None-Match"] = cached["etag"]
+                if cached["last_modified"]:
+                    headers["If-Modified-Since"] = cached["last_modified"]
+
+        start = time.perf_counter()
+        response = self._send(endpoint, params, headers)
+        revalidated = bool(cached) and response.status_code == 304
+        metrics.record_request(
+            endpoint, response.status_code, time.perf_counter() - start, len(response.content),
+            "revalidated" if revalidated else ("miss" if self.cache else "off"),
+            rate_remaining=response.headers.get("X-RateLimit-Remaining")
+        )
+        if revalidated:
+            self.cache.refresh(key)
+            return cached["data"], cached["links"]
+        response.raise_for_status()
+        data = response.json()
+        links = {rel: link["url"] for rel, link in response.links.items()}
+        if self.cache:
+            self.cache.store(
+                endpoint, key, data,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+                links=links
+            )
+        return data, links
+
+    def _graphql(self, query: str, variables: Dict) -> Dict:
+        """POST a GraphQL query and return the full payload (``data`` and any ``errors``)"""
+        metrics = get_metrics()
+        key = make_cache_key("/graphql", {"query": query, "variables": json.dumps(variables, sort_keys=True)})
+        if self.cache:
+            cached = self.cache.lookup("/graphql", key)
+            if cached and cached["fresh"]:
+                metrics.record_request("/graphql", None, 0.0, 0, "hit")
+                return cached["data"]
+
+        start = time.perf_counter()
+        response = self._send("/graphql", None, dict(self.headers), body={"query": query, "variables": variables})
+        metrics.record_request(
+            "/graphql", response.status_code, time.perf_counter() - start, len(response.content),
+            "miss" if self.cache else "off",
+            rate_remaining=response.headers.get("X-RateLimit-Remaining")
         )
         response.raise_for_status()
-        return response.json()
+        payload = response.json()
+        if self.cache and not payload.get("errors"):
+            self.cache.store("/graphql", key, payload)
+        return payload
+
+    def _send(self, endpoint: str, params: Dict, headers: Dict, body: Dict = None) -> requests.Response:
+        """Issue a GET (or a POST of ``body``) once the scheduler grants a token, retrying rate-limited responses"""
+        resource = resource_for(endpoint)
+        for attempt in range(MAX_RATE_LIMIT_RETRIES + 1):
+            token = self.scheduler.acquire(resource)
+            request_headers = dict(headers)
+            if token:
+                request_headers["Authorization"] = f"token {token}"
+            if body is not None:
+                response = http_post(self.graphql_url, headers=request_headers, json=body)
+            else:
+                response = http_get(
+                    f"{self.base_url}{endpoint}",
+                    headers=request_headers,
+                    params=params
+                )
+            self.scheduler.update(token, resource, response.headers, response.status_code)
+            rate_limited = response.status_code == 429 or (
+                response.status_code == 403 and (
+                    "Retry-After" in response.headers
+                    or response.headers.get("X-RateLimit-Remaining") == "0"
+                )
+            )
+            if not rate_limited or attempt == MAX_RATE_LIMIT_RETRIES:
+                return response
@@ -0,0 +1,98 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from src.models import Repo
+
+# GitHub charges a GraphQL query by the number of nodes it may return
+# (roughly one point per 100 nodes) and rejects queries that run too long, so
+# lookups are packed into queries whose estimated node count stays under this.
+MAX_BATCH_COST = 250
+TOPIC_TOP_REPOS = 5
+
+# Only the fields the README, issue comments and snapshots use
+REPOSITORY_FIELDS = "nameWithOwner url description stargazerCount primaryLanguage { name }"
+
+
+@dataclass
+class Lookup:
+    """One aliased ``search`` or ``repository`` field of a batched query"""
+    key: str
+    kind: str  # "topic" or "repository"
+    variables: Dict[str, str] = field(default_factory=dict)
+    cost: int = 1
+
+    def render(self, alias: str) -> str:
+        names = {name: f"{alias}_{name}" for name in self.variables}
+        if self.kind == "topic":
+            return (f"{alias}: search(query: ${names['q']}, type: REPOSITORY, first: {TOPIC_TOP_REPOS}) "
+                    f"{{ repositoryCount nodes {{ ... on Repository {{ {REPOSITORY_FIELDS} }} }} }}")
+        return (f"{alias}: repository(owner: ${names['owner']}, name: ${names['name']}) "
+                "{ stargazerCount forkCount issues(states: OPEN) { totalCount } "
+                "pullRequests(states: OPEN) { totalCount } }")
+
+
+def topic_lookup(topic: str) -> Lookup:
+    """Same search as GitHubAPI._get_single_topic_stats: the topic, most-starred first"""
+    return Lookup(topic, "topic", {"q": f"topic:{topic} sort:stars-desc"}, cost=1 + TOPIC_TOP_REPOS)
+
+
+def repository_lookup(full_name: str) -> Lookup:
+    owner, name = full_name.split("/", 1)
+    return Lookup(full_name, "repository", {"owner": owner, "name": name})
+
+
+def split_batches(lookups: List[Lookup], max_cost: int = MAX_BATCH_COST) -> List[List[Lookup]]:
+    """Pack lookups, in order, into batches whose summed cost stays within ``max_cost``"""
+    batches, batch, cost = [], [], 0
+    for lookup in lookups:
+        if batch and cost + lookup.cost > max_cost:
+            batches.append(batch)
+            batch, cost = [], 0
+        batch.append(lookup)
+        cost += lookup.cost
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def build_query(batch: List[Lookup]) -> Tuple[str, Dict[str, str]]:
+    """Build one aliased query (plus its variables) covering every lookup in ``batch``.
+
+    User-supplied strings are passed as variables, never spliced into the query text.
+    """
+    declarations, fields, variables = [], [], {}
+    for i, lookup in enumerate(batch):
+        alias = f"l{i}"
+        for name, value in lookup.variables.items():
+            declarations.append(f"${alias}_{name}: String!")
+            variables[f"{alias}_{name}"] = value
+        fields.append(lookup.render(alias))
+    query = f"query({', '.join(declarations)}) {{ {' '.join(fields)} rateLimit {{ cost remaining }} }}"
+    return query, variables
+
+
+def repo_from_node(node: Dict) -> Repo:
+    """GraphQL Repository node as the same Repo record REST results are projected to"""
+    return Repo(
+        full_name=node.get("nameWithOwner"),
+        html_url=node.get("url"),
+        description=node.get("description"),
+        stargazers_count=node.get("stargazerCount", 0),
+        language=(node.get("primaryLanguage") or {}).get("name"),
+    )
+
+
+def shape_result(lookup: Lookup, data: Optional[Dict]) -> Dict:
+    """Convert an alias's data to what the REST methods return for the same lookup"""
+    if lookup.kind == "topic":
+        return {
+            "total_count": data.get("repositoryCount", 0),
+            "top_repos": [repo_from_node(node) for node in data.get("nodes", []) if node][:TOPIC_TOP_REPOS],
+        }
+    # REST's open_issues_count includes pull requests, and its watchers_count mirrors stars
+    return {
+        "stars": data.get("stargazerCount", 0),
+        "forks": data.get("forkCount", 0),
+        "issues": data["issues"]["totalCount"] + data["pullRequests"]["totalCount"],
+        "watchers": data.get("stargazerCount", 0),
+    }
@@ -0,0 +1,126 @@
+import os
+import threading
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from github import Auth, Github
+from github.Requester import HTTPRequestsConnectionClass, HTTPSRequestsConnectionClass, Requester
+
+from src.metrics import get_metrics
+
+DEFAULT_TIMEOUT = (5, 30)  # (connect, read) seconds
+POOL_SIZE = 16
+
+_lock = threading.Lock()
+_session = None
+_github_clients: Dict[Optional[str], Github] = {}
+_pygithub_call = threading.local()
+
+
+def github_token() -> Optional[str]:
+    """Token used when a caller does not pass one explicitly"""
+    return os.getenv("GITHUB_TOKEN") or os.getenv("ACCESS_TOKEN")
+
+
+def get_session() -> requests.Session:
+    """Process-wide keep-alive session used for all raw REST calls.
+
+    Connections are pooled per host, so a whole run pays one TLS handshake
+    per host instead of one per request. Auth headers are added per request
+    by the caller, since GitHubAPI rotates over a pool of tokens.
+    """
+    global _session
+    with _lock:
+        if _session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Accept-Encoding": "gzip, deflate",
+                "User-Agent": "shit-stats",
+            })
+            # A session-level auth, even a no-op, keeps requests from replacing
+            # the callers' Authorization headers with ~/.netrc credentials
+            session.auth = Requester.noopAuth
+            session.hooks["response"].append(_record_pygithub_response)
+            _session = session
+        return _session
+
+
+def _record_pygithub_response(response: requests.Response, *args, **kwargs):
+    """Response hook of the shared session: record calls made by PyGithub.
+
+    GitHubAPI records its own calls, with their cache outcome, so only calls
+    issued from an _InstrumentedConnection on this thread are recorded here.
+    """
+    if getattr(_pygithub_call, "active", False):
+        get_metrics().record_request(
+            response.request.path_url, response.status_code, response.elapsed.total_seconds(),
+            len(response.content), "off", rate_remaining=response.headers.get("X-RateLimit-Remaining"),
+            client="pygithub"
+        )
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """GET through the shared session with the default timeout applied"""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().get(url, **kwargs)
+
+
+def http_post(url: str, **kwargs) -> requests.Response:
+    """POST through the shared session with the default timeout applied"""
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    return get_session().post(url, **kwargs)
+
+
+class _InstrumentedConnection:
+    """Mixin for PyGithub's connection classes that sends their calls through get_session().
+
+    PyGithub gives every connection object a requests session of its own;
+    using the shared one instead keeps a single keep-alive pool per host for
+    GitHubAPI and PyGithub alike. Calls are recorded in the run metrics by
+    that session's response hook (see _record_pygithub_response).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.session.close()
+        self.session = get_session()
+
+    def getresponse(self):
+        _pygithub_call.active = True
+        try:
+            return super().getresponse()
+        finally:
+            _pygithub_call.active = False
+
+    def close(self):
+        # Injected connections are closed after each request; the shared
+        # session's pool is meant to outlive them, so it is left open
+        self.session = None
+
+
+class _InstrumentedHTTPConnection(_InstrumentedConnection, HTTPRequestsConnectionClass):
+    pass
+
+
+class _InstrumentedHTTPSConnection(_InstrumentedConnection, HTTPSRequestsConnectionClass):
+    pass
+
+
+def get_github(token: str = None) -> Github:
+    """Shared PyGithub client for ``token`` (defaults to GITHUB_TOKEN)"""
+    token = token or github_token()
+    with _lock:
+        if not _github_clients:
+            Requester.injectConnectionClasses(_InstrumentedHTTPConnection, _InstrumentedHTTPSConnection)
+        if token not in _github_clients:
+            _github_clients[token] = Github(
+                auth=Auth.Token(token) if token else None,
+                base_url=os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/"),
+                timeout=DEFAULT_TIMEOUT[1],
+                pool_size=POOL_SIZE,
+            )
+        return _github_clients[token]
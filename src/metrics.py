@@ -0,0 +1,197 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+DEFAULT_METRICS_DIR = ".github/stats/metrics"
+
+# Path segments that identify one object rather than an endpoint, collapsed so
+# per-endpoint aggregates stay small ("/repos/{owner}/{repo}/issues/{number}").
+_REPO_PATH = re.compile(r"^/repos/[^/]+/[^/]+")
+_NUMBER_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+
+def endpoint_label(path: str) -> str:
+    """Normalize a request path (with or without host and query) to an endpoint name"""
+    path = re.sub(r"^https?://[^/]+", "", path).split("?", 1)[0]
+    path = _REPO_PATH.sub("/repos/{owner}/{repo}", path)
+    path = re.sub(r"/contents/.*$", "/contents/{path}", path)
+    return _NUMBER_SEGMENT.sub("/{number}", path) or "/"
+
+
+class RunMetrics:
+    """Per-request and per-stage measurements for one script run.
+
+    Requests are recorded by GitHubAPI and by the instrumented PyGithub
+    connection in src.http_client; stages are timed with ``stage()``.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.requests: List[Dict] = []
+        self.stages: Dict[str, float] = {}
+        self.rate_limit_remaining: Dict[str, int] = {}
+
+    def reset(self):
+        """Start a new run window, for a process that runs more than once (see src.daemon)"""
+        with self._lock:
+            self.started_at = time.time()
+            self.requests = []
+            self.stages = {}
+
+    def record_request(self, endpoint: str, status: Optional[int], latency: float, size: int,
+                       cache: str, rate_remaining: Optional[str] = None, client: str = "rest"):
+        """Record one API call. ``cache`` is "hit", "revalidated", "miss" or "off"."""
+        entry = {
+            "endpoint": endpoint_label(endpoint),
+            "client": client,
+            "status": status,
+            "latency_s": round(latency, 4),
+            "bytes": size,
+            "cache": cache,
+            "rate_limit_remaining": int(rate_remaining) if rate_remaining not in (None, "") else None,
+        }
+        with self._lock:
+            self.requests.append(entry)
+            if entry["rate_limit_remaining"] is not None:
+                resource = "search" if entry["endpoint"].startswith("/search/") else "core"
+                self.rate_limit_remaining[resource] = entry["rate_limit_remaining"]
+
+    @contextmanager
+    def stage(self, name: str):
+        """Time the enclosed block as stage ``name`` (repeated stages accumulate)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages[name] = round(self.stages.get(name, 0.0) + elapsed, 4)
+
+    def summary(self) -> Dict:
+        """Machine-readable view of the run: totals, per-endpoint aggregates, stages and raw requests"""
+        with self._lock:
+            requests = list(self.requests)
+            stages = dict(self.stages)
+            remaining = dict(self.rate_limit_remaining)
+        endpoints: Dict[str, Dict] = {}
+        for r in requests:
+            agg = endpoints.setdefault(r["endpoint"], {
+                "requests": 0, "latency_s": 0.0, "max_latency_s": 0.0, "bytes": 0,
+                "cache_hits": 0, "errors": 0,
+            })
+            agg["requests"] += 1
+            agg["latency_s"] = round(agg["latency_s"] + r["latency_s"], 4)
+            agg["max_latency_s"] = max(agg["max_latency_s"], r["latency_s"])
+            agg["bytes"] += r["bytes"]
+            agg["cache_hits"] += r["cache"] in ("hit", "revalidated")
+            agg["errors"] += bool(r["status"] and r["status"] >= 400)
+        network = [r for r in requests if r["cache"] != "hit"]
+        return {
+            "started_at": datetime.fromtimestamp(self.started_at).isoformat(timespec="seconds"),
+            "duration_s": round(time.time() - self.started_at, 3),
+            "totals": {
+                "requests": len(requests),
+                "network_requests": len(network),
+                "cache_hits": sum(r["cache"] in ("hit", "revalidated") for r in requests),
+                "bytes": sum(r["bytes"] for r in requests),
+                "latency_s": round(sum(r["latency_s"] for r in network), 4),
+            },
+            "rate_limit_remaining": remaining,
+            "stages": stages,
+            "endpoints": endpoints,
+            "requests": requests,
+        }
+
+    def to_prometheus(self, run: str) -> str:
+        """Prometheus text exposition of the summary, e.g. for a node_exporter textfile collector"""
+        summary = self.summary()
+        lines = []
+
+        def metric(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                labels = dict(labels, run=run)
+                label_text = ",".join(f'{k}="{v}"' for k, v in sorted(labels.items()))
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        endpoints = summary["endpoints"].items()
+        metric("github_api_requests_total", "counter", "API requests made, including cache hits.",
+               [({"endpoint": e}, a["requests"]) for e, a in endpoints])
+        metric("github_api_cache_hits_total", "counter", "API requests answered from the response cache.",
+               [({"endpoint": e}, a["cache_hits"]) for e, a in endpoints])
+        metric("github_api_errors_total", "counter", "API responses with an error status.",
+               [({"endpoint": e}, a["errors"]) for e, a in endpoints])
+        metric("github_api_latency_seconds_total", "counter", "Time spent waiting on API responses.",
+               [({"endpoint": e}, a["latency_s"]) for e, a in endpoints])
+        metric("github_api_response_bytes_total", "counter", "Response body bytes received.",
+               [({"endpoint": e}, a["bytes"]) for e, a in endpoints])
+        metric("github_api_rate_limit_remaining", "gauge", "Rate-limit budget left after the last response.",
+               [({"resource": r}, v) for r, v in summary["rate_limit_remaining"].items()])
+        metric("run_stage_duration_seconds", "gauge", "Wall time of each stage of the run.",
+               [({"stage": s}, v) for s, v in summary["stages"].items()])
+        metric("run_duration_seconds", "gauge", "Wall time of the whole run.",
+               [({}, summary["duration_s"])])
+        return "\n".join(lines) + "\n"
+
+    def write(self, run: str, timestamp: str = None, directory: str = None) -> Path:
+        """Write ``<timestamp>_<run>.json`` to the metrics directory, plus Prometheus text if requested.
+
+        The directory defaults to METRICS_DIR or .github/stats/metrics, next to
+        the snapshot store. Set METRICS_PROMETHEUS to a directory to also
+        write ``<run>.prom`` there in the Prometheus text format.
+        """
+        timestamp = timestamp or datetime.now().strftime("%Y%m%d_%H%M")
+        directory = Path(directory or os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR))
+        directory.mkdir(parents=True, exist_ok=True)
+        path = directory / f"{timestamp}_{run}.json"
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(dict(self.summary(), run=run, timestamp=timestamp), f, indent=2)
+
+        prometheus_dir = os.getenv("METRICS_PROMETHEUS")
+        if prometheus_dir:
+            Path(prometheus_dir).mkdir(parents=True, exist_ok=True)
+            prometheus_path = Path(prometheus_dir) / f"{run}.prom"
+            tmp_path = prometheus_path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus(run))
+            os.replace(tmp_path, prometheus_path)
+        return path
+
+
+_metrics = RunMetrics()
+
+
+def get_metrics() -> RunMetrics:
+    """Process-wide metrics collector shared by every client and stage"""
+    return _metrics
+
+
+def prune_metrics(max_age_days: int, directory: str = None, now: datetime = None) -> int:
+    """Delete metrics files written more than ``max_age_days`` ago; returns how many"""
+    directory = Path(directory or os.getenv("METRICS_DIR", DEFAULT_METRICS_DIR))
+    cutoff = ((now or datetime.now()) - timedelta(days=max_age_days)).strftime("%Y%m%d_%H%M")
+    removed = 0
+    for path in directory.glob("*_*_*.json"):
+        # Names start with the run's YYYYMMDD_HHMM, so they compare as strings
+        if path.name[:13] < cutoff:
+            path.unlink()
+            removed += 1
+    return removed
+
+
+def write_metrics(run: str, timestamp: str = None):
+    """Write the shared metrics for ``run``, reporting (not raising) failures"""
+    try:
+        path = _metrics.write(run, timestamp)
+        print(f"Wrote run metrics to {path}")
+    except OSError as e:
+        print(f"Could not write run metrics: {e}", file=sys.stderr)
@@ -0,0 +1,44 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+
+@dataclass(frozen=True, slots=True)
+class Repo:
+    """The handful of repository fields the scripts read, projected once at ingest.
+
+    Search results carry ~80 fields plus nested owner/license objects; keeping
+    only these makes each result a few hundred bytes in memory and in snapshots.
+    ``created_at`` is kept for the planner's local ``created:>`` filter.
+    """
+    full_name: str
+    html_url: str
+    description: Optional[str] = None
+    stargazers_count: int = 0
+    language: Optional[str] = None
+    topics: Tuple[str, ...] = ()
+    created_at: Optional[str] = None
+
+    @classmethod
+    def from_api(cls, item: Dict) -> "Repo":
+        """Project a REST search/repository item (or an already projected dict)"""
+        return cls(
+            full_name=item.get("full_name"),
+            html_url=item.get("html_url"),
+            description=item.get("description"),
+            stargazers_count=item.get("stargazers_count") or 0,
+            language=item.get("language"),
+            topics=tuple(item.get("topics") or ()),
+            created_at=item.get("created_at"),
+        )
+
+    def to_dict(self) -> Dict:
+        """JSON-ready form, as stored in snapshots"""
+        return {
+            "full_name": self.full_name,
+            "html_url": self.html_url,
+            "description": self.description,
+            "stargazers_count": self.stargazers_count,
+            "language": self.language,
+            "topics": list(self.topics),
+            "created_at": self.created_at,
+        }
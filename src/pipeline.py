@@ -0,0 +1,181 @@
+"""Run the scheduled jobs (stats, trending, viz, compact) in one process as a dependency graph.
+
+    python -m src run                  # every job
+    python -m src run --only trending  # a subset
+    python -m src daemon               # keep running them on intervals, see src.daemon
+
+Jobs share one GitHubAPI client and an in-run result cache, so a search
+needed by two jobs is fetched once. Jobs whose dependencies are done run in
+parallel, and the chart libraries are only imported by the viz job.
+"""
+import argparse
+import os
+import sys
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List
+
+# Repository root and .github/scripts, so the job scripts and their helpers import
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(REPO_ROOT, '.github', 'scripts'))
+sys.path.insert(0, REPO_ROOT)
+
+from src.github_api import GitHubAPI
+from src.http_client import github_token
+from src.metrics import get_metrics, write_metrics
+from src.star_index import get_trending_by_growth
+
+
+class RunContext:
+    """State shared by every job of one run"""
+
+    def __init__(self, token: str = None, api: GitHubAPI = None, index=None):
+        self.token = token or github_token()
+        # A long-running caller passes its warm client and star index; a single run makes its own
+        self.api = api or GitHubAPI(self.token)
+        self.index = index
+        self.timestamp = datetime.now().strftime('%Y%m%d_%H%M')
+        self._results = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def memo(self, key: str, compute: Callable):
+        """Compute ``key`` once per run; concurrent callers wait for the first one"""
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._results:
+                self._results[key] = compute()
+            return self._results[key]
+
+    def trending(self) -> Dict:
+        """Weekly trending ranking, long enough for both the README and PUBLIC_REPOS.md"""
+        from updates_stats import TRENDING_LIMIT
+        return self.memo('trending', lambda: get_trending_by_growth(self.api, TRENDING_LIMIT, self.index))
+
+
+@dataclass
+class Job:
+    name: str
+    run: Callable[[RunContext], None]
+    deps: List[str] = field(default_factory=list)
+
+
+def run_stats(ctx: RunContext):
+    import updates_stats
+    updates_stats.main(ctx.timestamp, api=ctx.api, trending_repos=ctx.trending())
+
+
+def run_trending(ctx: RunContext):
+    from src import update_trending
+    # Both jobs rank the same candidates, so the top N of the shared ranking is this job's top N
+    items = ctx.trending().get('items', [])[:update_trending.TRENDING_LIMIT]
+    update_trending.update_public_repos_file(items)
+
+
+def run_viz(ctx: RunContext):
+    from src import visualizations  # pandas and plotly load here, only when charts are drawn
+    visualizations.main()
+
+
+def run_compact(ctx: RunContext):
+    from src.metrics import prune_metrics
+    from src.snapshots import RetentionPolicy, SnapshotStore
+    policy = RetentionPolicy()
+    store = SnapshotStore('.github/stats')
+    removed = store.compact(policy)
+    print(f"Compacted .github/stats: {removed} snapshot(s) rolled up")
+    if removed:
+        # The trend aggregates hold a row per snapshot, so they are refolded from the rollups
+        from src.visualizations import rebuild_aggregates
+        rebuild_aggregates(store)
+    # Per-run metrics are only kept for the full-resolution window
+    print(f"Pruned {prune_metrics(policy.full_days)} metrics file(s)")
+
+
+JOBS = {job.name: job for job in [
+    Job('stats', run_stats),
+    Job('trending', run_trending),
+    Job('viz', run_viz, deps=['stats']),
+    # Rewrites the store's files, so it runs once nothing else reads them
+    Job('compact', run_compact, deps=['stats', 'viz']),
+]}
+
+
+def select_jobs(only: List[str] = None) -> List[str]:
+    """Job names to run, in declaration order. Dependencies outside the selection
+    are assumed to have run already (e.g. ``--only viz`` redraws from the existing store)."""
+    return [name for name in JOBS if not only or name in only]
+
+
+def run(only: List[str] = None, max_workers: int = 4, ctx: RunContext = None) -> Dict[str, str]:
+    """Run the selected jobs, each as soon as its dependencies succeed.
+
+    Returns each job's outcome: "ok", "failed" or "skipped" (a dependency failed).
+    """
+    ctx = ctx or RunContext()
+    metrics = get_metrics()
+    names = select_jobs(only)
+    outcome = {}
+
+    def execute(job):
+        with metrics.stage(f"job:{job.name}"):
+            job.run(ctx)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        running = {}
+        while len(outcome) < len(names):
+            for name in names:
+                if name in outcome or name in running.values():
+                    continue
+                deps = [d for d in JOBS[name].deps if d in names]
+                if any(outcome.get(d) in ('failed', 'skipped') for d in deps):
+                    outcome[name] = 'skipped'
+                    print(f"Skipping {name}: a dependency did not succeed", file=sys.stderr)
+                elif all(outcome.get(d) == 'ok' for d in deps):
+                    running[pool.submit(execute, JOBS[name])] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    future.result()
+                    outcome[name] = 'ok'
+                except (Exception, SystemExit) as e:  # the job scripts sys.exit on fatal errors
+                    outcome[name] = 'failed'
+                    print(f"Job {name} failed: {e!r}", file=sys.stderr)
+    write_metrics('pipeline', ctx.timestamp)
+    return outcome
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(prog='python -m src', description="Run the scheduled jobs")
+    commands = parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help="Run jobs as a dependency graph")
+    run_parser.add_argument('--only', nargs='+', choices=list(JOBS), help="Run only these jobs")
+    run_parser.add_argument('--workers', type=int, default=4, help="Maximum jobs running at once")
+    daemon_parser = commands.add_parser('daemon', help="Keep running jobs on their own intervals")
+    daemon_parser.add_argument('--every', action='append', default=[], metavar='JOB=SECONDS',
+                               help="Interval of a job (repeatable), e.g. --every stats=600")
+    daemon_parser.add_argument('--jitter', type=float, default=0.1,
+                               help="Random spread of each interval, as a fraction of it")
+    daemon_parser.add_argument('--port', type=int, default=8787, help="Local health/status port (0 disables)")
+    daemon_parser.add_argument('--workers', type=int, default=4, help="Maximum jobs running at once")
+    args = parser.parse_args(argv)
+
+    if args.command == 'daemon':
+        from src.daemon import parse_intervals, run_daemon
+        try:
+            intervals = parse_intervals(args.every)
+        except ValueError as e:
+            parser.error(str(e))
+        run_daemon(intervals, jitter=args.jitter, port=args.port, max_workers=args.workers)
+        return
+
+    outcome = run(args.only, max_workers=args.workers)
+    for name, result in outcome.items():
+        print(f"{name}: {result}")
+    sys.exit(0 if all(result == 'ok' for result in outcome.values()) else 1)
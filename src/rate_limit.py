@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Documented per-token budgets, used until the first response tells us otherwise.
+# Each entry is (requests per window, window length in seconds).
+DEFAULT_LIMITS = {
+    "core": (5000, 3600),
+    "search": (30, 60),
+    "graphql": (5000, 3600),
+}
+UNAUTHENTICATED_LIMITS = {
+    "core": (60, 3600),
+    "search": (10, 60),
+    "graphql": (0, 3600),
+}
+
+
+def resource_for(endpoint: str) -> str:
+    """Map an API endpoint to the rate-limit resource that meters it"""
+    if endpoint.startswith("/search/"):
+        return "search"
+    if endpoint.startswith("/graphql"):
+        return "graphql"
+    return "core"
+
+
+class TokenBucket:
+    """Remaining budget of one token for one rate-limit resource"""
+
+    def __init__(self, limit: int, window: int):
+        self.limit = limit
+        self.window = window
+        self.remaining = limit
+        self.reset_at = time.time() + window
+        self.blocked_until = 0.0
+
+    def available_at(self, now: float) -> float:
+        if now < self.blocked_until:
+            return self.blocked_until
+        if self.remaining > 0:
+            return now
+        return max(self.reset_at, now)
+
+    def take(self, now: float):
+        if now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = now + self.window
+        self.remaining -= 1
+
+
+class RateLimitScheduler:
+    """Spreads requests over a pool of tokens, one bucket per token and resource.
+
+    Buckets start from the documented limits and are corrected from the
+    ``X-RateLimit-*`` and ``Retry-After`` headers of every response, so callers
+    wait for the next reset instead of failing with a 403/429.
+    """
+
+    def __init__(self, tokens: List[Optional[str]] = None):
+        self.tokens = list(tokens or [None])
+        self._buckets: Dict[tuple, TokenBucket] = {}
+        self._cond = threading.Condition()
+
+    def _bucket(self, token: Optional[str], resource: str) -> TokenBucket:
+        key = (token, resource)
+        if key not in self._buckets:
+            limits = DEFAULT_LIMITS if token else UNAUTHENTICATED_LIMITS
+            self._buckets[key] = TokenBucket(*limits.get(resource, DEFAULT_LIMITS["core"]))
+        return self._buckets[key]
+
+    def acquire(self, resource: str) -> Optional[str]:
+        """Block until some token has budget for ``resource`` and reserve one request"""
+        with self._cond:
+            while True:
+                now = time.time()
+                best_token, best_at, best_remaining = None, None, -1
+                for token in self.tokens:
+                    bucket = self._bucket(token, resource)
+                    at = bucket.available_at(now)
+                    remaining = bucket.remaining if now < bucket.reset_at else bucket.limit
+                    if best_at is None or at < best_at or (at == best_at and remaining > best_remaining):
+                        best_token, best_at, best_remaining = token, at, remaining
+                if best_at <= now:
+                    self._bucket(best_token, resource).take(now)
+                    return best_token
+                self._cond.wait(timeout=best_at - now)
+
+    def update(self, token: Optional[str], resource: str, headers, status: int = 200):
+        """Fold the rate-limit headers of a response back into its bucket"""
+        with self._cond:
+            bucket = self._bucket(token, headers.get("X-RateLimit-Resource", resource))
+            now = time.time()
+            if headers.get("X-RateLimit-Limit"):
+                bucket.limit = int(headers["X-RateLimit-Limit"])
+            if headers.get("X-RateLimit-Remaining"):
+                bucket.remaining = int(headers["X-RateLimit-Remaining"])
+            if headers.get("X-RateLimit-Reset"):
+                bucket.reset_at = float(headers["X-RateLimit-Reset"])
+            retry_after = headers.get("Retry-After")
+            if retry_after:
+                bucket.blocked_until = now + float(retry_after)
+            elif status in (403, 429) and bucket.remaining == 0:
+                bucket.blocked_until = bucket.reset_at
+            self._cond.notify_all()
+
+    def status(self) -> Dict[str, Dict]:
+        """Snapshot of remaining budget per resource, summed over the token pool"""
+        with self._cond:
+            now = time.time()
+            result = {}
+            for (token, resource), bucket in self._buckets.items():
+                entry = result.setdefault(resource, {"remaining": 0, "reset_at": 0.0})
+                entry["remaining"] += bucket.remaining if now < bucket.reset_at else bucket.limit
+                entry["reset_at"] = max(entry["reset_at"], bucket.reset_at)
+            return result
@@ -0,0 +1,80 @@
+import re
+from pathlib import Path
+from typing import Dict, Optional
+
+# A generated region looks like
+#
+#   <!-- BEGIN:trending -->
+#   - ...
+#   <!-- END:trending -->
+#
+# Everything between the markers is owned by the renderer and replaced
+# wholesale, so reruns never accumulate duplicate entries.
+REGION_PATTERN = re.compile(
+    r"(?P<begin><!-- BEGIN:(?P<name>[\w-]+) -->\n)(?P<body>.*?)(?P<end><!-- END:(?P=name) -->)",
+    re.DOTALL,
+)
+
+
+def begin_marker(name: str) -> str:
+    return f"<!-- BEGIN:{name} -->"
+
+
+def end_marker(name: str) -> str:
+    return f"<!-- END:{name} -->"
+
+
+def read_region(content: str, name: str) -> Optional[str]:
+    """Return the current body of region ``name``, or None if it has no markers"""
+    for match in REGION_PATTERN.finditer(content):
+        if match.group("name") == name:
+            return match.group("body")
+    return None
+
+
+def render_regions(content: str, regions: Dict[str, str]) -> str:
+    """Replace the body of every region named in ``regions`` in a single pass"""
+    def replace(match):
+        name = match.group("name")
+        if name not in regions:
+            return match.group(0)
+        body = regions[name]
+        if body and not body.endswith("\n"):
+            body += "\n"
+        return match.group("begin") + body + match.group("end")
+
+    return REGION_PATTERN.sub(replace, content)
+
+
+def ensure_regions(content: str, headers: Dict[str, str]) -> str:
+    """Add markers for regions that do not have them yet.
+
+    ``headers`` maps a region name to the heading line it sits under. The list
+    directly below an existing heading is wrapped (the next render replaces
+    it); a missing heading is appended at the end of the file.
+    """
+    for name, header in headers.items():
+        if begin_marker(name) in content:
+            continue
+        lines = content.split("\n")
+        try:
+            start = lines.index(header) + 1
+        except ValueError:
+            content = content.rstrip("\n") + f"\n\n{header}\n{begin_marker(name)}\n{end_marker(name)}\n"
+            continue
+        end = start
+        while end < len(lines) and lines[end].startswith("- "):
+            end += 1
+        lines[start:end] = [begin_marker(name)] + lines[start:end] + [end_marker(name)]
+        content = "\n".join(lines)
+    return content
+
+
+def write_if_changed(path, content: str) -> bool:
+    """Write ``content`` to ``path`` only if its bytes differ; return whether it wrote"""
+    path = Path(path)
+    data = content.encode("utf-8")
+    if path.exists() and path.read_bytes() == data:
+        return False
+    path.write_bytes(data)
+    return True
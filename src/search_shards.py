@@ -0,0 +1,146 @@
+"""Search past the 1000-result cap by splitting a query into shards.
+
+A shard is the base query narrowed to a ``stars:`` range and a ``created:``
+window. Shards matching more than SEARCH_RESULT_CAP repositories are split,
+star range first, until every shard can be paged completely. A shard whose
+star range is a single value never needs paging when only counts and star
+totals are wanted: its star total is that value times its ``total_count``.
+"""
+import math
+import sys
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.github_api import DEFAULT_MAX_CONCURRENCY, SEARCH_RESULT_CAP, GitHubAPI, language_rollup_view
+from src.models import Repo
+
+MAX_STARS = 10_000_000           # above the most-starred repository on GitHub
+GITHUB_LAUNCH = date(2007, 10, 1)  # nothing was created before this
+LANGUAGE_LIMIT = 10
+
+
+@dataclass(frozen=True)
+class Shard:
+    """``base`` narrowed to ``stars`` and ``created``, both inclusive ranges"""
+    base: str
+    stars: Tuple[int, int]
+    created: Tuple[date, date]
+
+    def query(self) -> str:
+        low, high = self.stars
+        stars = f"stars:{low}" if low == high else f"stars:{low}..{high}"
+        return f"{self.base} {stars} created:{self.created[0].isoformat()}..{self.created[1].isoformat()}".strip()
+
+    def split(self) -> Optional[Tuple["Shard", "Shard"]]:
+        """Two shards covering this one, or None when it cannot be narrowed further.
+
+        Star counts are heavy-tailed, so ranges are cut at their geometric mean,
+        which halves the repositories far better than the arithmetic one.
+        """
+        low, high = self.stars
+        if low < high:
+            middle = min(max(int(math.sqrt(max(low, 1) * high)), low), high - 1)
+            return replace(self, stars=(low, middle)), replace(self, stars=(middle + 1, high))
+        start, end = self.created
+        if start < end:
+            middle = start + (end - start) // 2
+            return replace(self, created=(start, middle)), replace(self, created=(middle + timedelta(days=1), end))
+        return None
+
+
+def root_shard(base: str, min_stars: int = 0, today: date = None) -> Shard:
+    """The shard for every repository matching ``base`` with more than ``min_stars`` stars"""
+    return Shard(base, (min_stars + 1, MAX_STARS), (GITHUB_LAUNCH, today or date.today()))
+
+
+def run_sharded(api: GitHubAPI, roots: List[Shard], on_repos: Callable[[Shard, List[Repo]], None],
+                on_count: Callable[[Shard, int], None] = None,
+                max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Dict[str, int]:
+    """Visit every repository under ``roots``, splitting shards over the cap.
+
+    Each shard is first counted with a one-result search. Shards within the
+    cap are paged and handed to ``on_repos``; when ``on_count`` is given,
+    single-star-value shards are handed to it with their count instead of being
+    paged. Callbacks run on the calling thread as shards finish, so results are
+    folded in as they stream in and need no locking. Requests go through
+    ``api``'s rate-limit scheduler, which paces the workers.
+
+    Returns counters: shards counted, shards paged, and shards truncated
+    because a single star value on a single day still exceeded the cap.
+    """
+    counters = {"counted": 0, "paged": 0, "truncated": 0}
+
+    def count(shard):
+        return api.search_count(shard.query())
+
+    def page(shard):
+        return list(api.iter_search(shard.query(), max_items=SEARCH_RESULT_CAP))
+
+    with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as pool:
+        pending = {pool.submit(count, shard): ("count", shard) for shard in roots}
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, shard = pending.pop(future)
+                result = future.result()
+                if kind == "page":
+                    counters["paged"] += 1
+                    on_repos(shard, result)
+                    continue
+                counters["counted"] += 1
+                if result == 0:
+                    continue
+                if on_count and shard.stars[0] == shard.stars[1]:
+                    on_count(shard, result)
+                    continue
+                halves = shard.split() if result > SEARCH_RESULT_CAP else None
+                if halves:
+                    for half in halves:
+                        pending[pool.submit(count, half)] = ("count", half)
+                    continue
+                if result > SEARCH_RESULT_CAP:
+                    counters["truncated"] += 1
+                    print(f"Shard '{shard.query()}' has {result} results; only {SEARCH_RESULT_CAP} are visible",
+                          file=sys.stderr)
+                pending[pool.submit(page, shard)] = ("page", shard)
+    return counters
+
+
+def language_totals(api: GitHubAPI, languages: Iterable[str], min_stars: int = 100,
+                    max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Tuple[Dict, Dict[str, int]]:
+    """Exact repository counts and star totals of ``languages`` over ``stars:>min_stars``.
+
+    Returns ``(stats, counters)``, with stats shaped like get_language_stats.
+    """
+    roots = {f'language:"{lang}"' if " " in lang else f"language:{lang}": lang for lang in languages}
+    stats = {lang: {"count": 0, "stars": 0} for lang in roots.values()}
+
+    def on_count(shard, total):
+        entry = stats[roots[shard.base]]
+        entry["count"] += total
+        entry["stars"] += total * shard.stars[0]
+
+    def on_repos(shard, repos):
+        entry = stats[roots[shard.base]]
+        entry["count"] += len(repos)
+        entry["stars"] += sum(repo.stargazers_count for repo in repos)
+
+    counters = run_sharded(api, [root_shard(base, min_stars) for base in roots], on_repos, on_count,
+                           max_concurrency)
+    return stats, counters
+
+
+def get_exact_language_stats(api: GitHubAPI, limit: int = LANGUAGE_LIMIT, min_stars: int = 100) -> Dict:
+    """Exact stats for the ``limit`` languages with the most stars in a capped sample.
+
+    The sample (the most-starred repositories, as get_language_stats sees them)
+    only picks which languages to count; their figures come from language_totals.
+    """
+    sample = api.get_views([language_rollup_view("languages", min_stars=min_stars)])["languages"]
+    languages = sorted(sample, key=lambda lang: sample[lang]["stars"], reverse=True)[:limit]
+    stats, counters = language_totals(api, languages, min_stars)
+    print(f"Language stats: {counters['counted']} shard(s) counted, {counters['paged']} paged, "
+          f"{counters['truncated']} truncated")
+    return stats
@@ -0,0 +1,53 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+# One row per (series, timestamp); series are stored back to back, each sorted by date
+ROW = np.dtype([("date", "<i8"), ("value", "<f8")])
+
+
+def write_series_table(path: Path, series: Dict[str, pd.Series]) -> Dict[str, Tuple[int, int]]:
+    """Write every series into one .npy table and return {name: (start, end)} row ranges.
+
+    The ranges are also saved next to the table as ``<path>.json``, so any
+    process can memory-map the table and slice out just the series it needs.
+    """
+    path = Path(path)
+    ranges, chunks, offset = {}, [], 0
+    for name, values in series.items():
+        values = values.dropna().sort_index()
+        chunk = np.empty(len(values), dtype=ROW)
+        chunk["date"] = values.index.asi8
+        chunk["value"] = values.to_numpy(dtype=float)
+        chunks.append(chunk)
+        ranges[name] = (offset, offset + len(chunk))
+        offset += len(chunk)
+    table = np.concatenate(chunks) if chunks else np.empty(0, dtype=ROW)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.save(f, table)
+    os.replace(tmp_path, path)
+    with open(f"{path}.json", "w", encoding="utf-8") as f:
+        json.dump(ranges, f)
+    return ranges
+
+
+def open_series_table(path: Path) -> np.ndarray:
+    """Read-only memory map of a table written by write_series_table"""
+    return np.load(path, mmap_mode="r")
+
+
+def read_series(table: np.ndarray, start: int, end: int) -> pd.Series:
+    rows = table[start:end]
+    return pd.Series(np.asarray(rows["value"]), index=pd.to_datetime(np.asarray(rows["date"])))
+
+
+def fingerprint(table: np.ndarray, start: int, end: int) -> str:
+    return hashlib.sha1(table[start:end].tobytes()).hexdigest()
@@ -0,0 +1,310 @@
+import argparse
+import json
+import os
+import struct
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_STATS_DIR = ".github/stats"
+COLUMNS = ("repository", "trending", "languages", "topics")
+
+# One fixed-width index record per snapshot: the timestamp followed by an
+# (offset, length) pair into each column file. A partially written trailing
+# record (e.g. after a crash) is ignored on read.
+_INDEX_RECORD = struct.Struct(">13s" + "QI" * len(COLUMNS))
+_INDEX_FILE = "snapshots.idx"
+# Compaction writes complete replacement files under this suffix first; see _finish_compaction
+_COMPACT_SUFFIX = ".compact"
+TIMESTAMP_FORMAT = "%Y%m%d_%H%M"
+
+
+def _encode(value):
+    """JSON fallback for records such as src.models.Repo that know their stored form"""
+    if hasattr(value, "to_dict"):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _encode_blob(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=_encode).encode("utf-8"))
+
+
+@dataclass
+class RetentionPolicy:
+    """How long snapshots keep each resolution, counted back from the newest snapshot"""
+    full_days: int = 14    # every snapshot, including its raw trending payload
+    daily_days: int = 90   # then one rollup per day; anything older rolls up per week
+
+    def bucket(self, when: datetime, newest: datetime) -> Optional[datetime]:
+        """Start of the rollup bucket ``when`` falls in, or None to keep it as is"""
+        age = newest - when
+        if age < timedelta(days=self.full_days):
+            return None
+        day = datetime(when.year, when.month, when.day)
+        if age < timedelta(days=self.full_days + self.daily_days):
+            return day
+        return day - timedelta(days=day.weekday())
+
+
+def roll_up(rows: List[Dict]) -> Dict:
+    """One snapshot standing in for ``rows``.
+
+    Language and topic figures are averaged per name, the repository stats are
+    the bucket's last ones, and raw payloads (trending items, topic top repos)
+    are dropped.
+    """
+    merged = {"repository": rows[-1]["repository"], "trending": None}
+    for column, fields in (("languages", ("count", "stars")), ("topics", ("total_count",))):
+        totals, seen = {}, {}
+        for row in rows:
+            for name, stats in (row[column] or {}).items():
+                sums = totals.setdefault(name, dict.fromkeys(fields, 0))
+                for field in fields:
+                    sums[field] += stats.get(field) or 0
+                seen[name] = seen.get(name, 0) + 1
+        merged[column] = {name: {field: round(value / seen[name]) for field, value in sums.items()}
+                          for name, sums in totals.items()}
+    return merged
+
+
+class SnapshotStore:
+    """Append-only, column-oriented store for the periodic stats snapshots.
+
+    Each column lives in its own ``<column>.col`` file as a sequence of
+    zlib-compressed JSON blobs, so a chart that only needs ``languages``
+    never reads or parses trending payloads.
+    """
+
+    def __init__(self, root: str = DEFAULT_STATS_DIR):
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._index_path = self.root / _INDEX_FILE
+        self._finish_compaction()
+
+    def _column_path(self, column: str) -> Path:
+        return self.root / f"{column}.col"
+
+    def _read_appended(self) -> List[tuple]:
+        """Index records in the order they were appended"""
+        if not self._index_path.exists():
+            return []
+        raw = self._index_path.read_bytes()
+        usable = len(raw) - len(raw) % _INDEX_RECORD.size
+        return [_INDEX_RECORD.unpack_from(raw, pos) for pos in range(0, usable, _INDEX_RECORD.size)]
+
+    def _read_index(self) -> List[tuple]:
+        # A later append with the same timestamp (two runs in one minute) replaces the earlier one
+        latest = {record[0]: record for record in self._read_appended()}
+        # Migrated snapshots may be appended out of order; the index is small, so sort in memory
+        return sorted(latest.values(), key=lambda r: r[0])
+
+    def timestamps(self) -> List[str]:
+        return [record[0].decode("ascii") for record in self._read_index()]
+
+    def append(self, timestamp: str, snapshot: Dict):
+        """Append one snapshot; keys outside COLUMNS are dropped.
+
+        A snapshot with the timestamp of an existing one replaces it.
+        """
+        pointers = []
+        for column in COLUMNS:
+            blob = _encode_blob(snapshot.get(column))
+            with open(self._column_path(column), "ab") as f:
+                offset = f.tell()
+                f.write(blob)
+                f.flush()
+                os.fsync(f.fileno())
+            pointers.extend((offset, len(blob)))
+        # The index record is written last, so a crash never exposes a half-written snapshot
+        with open(self._index_path, "ab") as f:
+            f.write(_INDEX_RECORD.pack(timestamp.encode("ascii"), *pointers))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def read(self, columns: List[str], since: str = None, until: str = None) -> Iterator[Dict]:
+        """Yield ``{"timestamp": ..., column: value, ...}`` in timestamp order.
+
+        ``since`` is exclusive and ``until`` inclusive, both as YYYYMMDD_HHMM.
+        Only the requested column files are opened.
+        """
+        records = []
+        for record in self._read_index():
+            timestamp = record[0].decode("ascii")
+            if since and timestamp <= since:
+                continue
+            if until and timestamp > until:
+                break
+            records.append(record)
+        return self._rows(records, columns)
+
+    def read_appended(self, columns: List[str], position: int = 0) -> Tuple[Iterator[Dict], int]:
+        """Rows appended from index ``position`` on, in append order, and the position after them.
+
+        Keeping the returned position as a high-water mark sees every later
+        append, including one that replaces an existing timestamp. Compaction
+        rewrites the index, so positions kept across one are meaningless.
+        """
+        records = self._read_appended()
+        return self._rows(records[position:], columns), len(records)
+
+    def latest(self, columns: List[str]) -> Optional[Dict]:
+        return next(self._rows(self._read_index()[-1:], columns), None)
+
+    def _rows(self, records: List[tuple], columns: List[str]) -> Iterator[Dict]:
+        unknown = set(columns) - set(COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown snapshot columns: {sorted(unknown)}")
+        # A fresh store has no index and no column files yet
+        if not records or not all(self._column_path(column).exists() for column in columns):
+            return
+        handles = {}
+        try:
+            for column in columns:
+                handles[column] = open(self._column_path(column), "rb")
+            for record in records:
+                row = {"timestamp": record[0].decode("ascii")}
+                for column in columns:
+                    i = COLUMNS.index(column)
+                    offset, length = record[1 + 2 * i], record[2 + 2 * i]
+                    handles[column].seek(offset)
+                    row[column] = json.loads(zlib.decompress(handles[column].read(length)))
+                yield row
+        finally:
+            for handle in handles.values():
+                handle.close()
+
+    def compact(self, policy: RetentionPolicy = None) -> int:
+        """Roll snapshots older than the policy's full-resolution window into daily,
+        then weekly, snapshots (see roll_up). Returns how many snapshots were removed.
+
+        Rollups are ordinary snapshots stamped with their bucket's start, so readers
+        need no changes. Compacting again leaves existing rollups alone until they
+        age into a coarser bucket.
+        """
+        policy = policy or RetentionPolicy()
+        records = self._read_index()
+        if not records:
+            return 0
+        newest = datetime.strptime(records[-1][0].decode("ascii"), TIMESTAMP_FORMAT)
+        groups = []  # (timestamp, records); records are sorted, so each bucket is contiguous
+        bucketed = False
+        for record in records:
+            timestamp = record[0].decode("ascii")
+            start = policy.bucket(datetime.strptime(timestamp, TIMESTAMP_FORMAT), newest)
+            if start is None:
+                groups.append((timestamp, [record]))
+            elif bucketed and groups[-1][0] == start.strftime(TIMESTAMP_FORMAT):
+                groups[-1][1].append(record)
+            else:
+                groups.append((start.strftime(TIMESTAMP_FORMAT), [record]))
+            bucketed = start is not None
+        if all(len(group) == 1 and group[0][0].decode("ascii") == timestamp for timestamp, group in groups):
+            return 0
+
+        column_files = {column: open(self._pending(self._column_path(column)), "wb") for column in COLUMNS}
+        sources = {column: open(self._column_path(column), "rb") for column in COLUMNS}
+        index = bytearray()
+        try:
+            for timestamp, group in groups:
+                if len(group) == 1 and group[0][0].decode("ascii") == timestamp:
+                    # Kept as is: copy the compressed blobs without decoding them
+                    blobs = []
+                    for i, column in enumerate(COLUMNS):
+                        offset, length = group[0][1 + 2 * i], group[0][2 + 2 * i]
+                        sources[column].seek(offset)
+                        blobs.append(sources[column].read(length))
+                else:
+                    merged = roll_up(list(self._rows(group, list(COLUMNS))))
+                    blobs = [_encode_blob(merged[column]) for column in COLUMNS]
+                pointers = []
+                for column, blob in zip(COLUMNS, blobs):
+                    pointers.extend((column_files[column].tell(), len(blob)))
+                    column_files[column].write(blob)
+                index += _INDEX_RECORD.pack(timestamp.encode("ascii"), *pointers)
+            for f in column_files.values():
+                f.flush()
+                os.fsync(f.fileno())
+        finally:
+            for f in list(column_files.values()) + list(sources.values()):
+                f.close()
+
+        # The pending index is what commits the compaction, so it only appears complete
+        tmp_path = self._index_path.with_name(_INDEX_FILE + ".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(index)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._pending(self._index_path))
+        self._finish_compaction()
+        return len(records) - len(groups)
+
+    @staticmethod
+    def _pending(path: Path) -> Path:
+        return path.with_name(path.name + _COMPACT_SUFFIX)
+
+    def _finish_compaction(self):
+        """Swap in the files of a compaction, or discard them if it never committed.
+
+        A pending index is only written once every pending column file is complete,
+        so after a crash the swap can always be finished from where it stopped.
+        """
+        committed = self._pending(self._index_path).exists()
+        for column in COLUMNS:
+            pending = self._pending(self._column_path(column))
+            if pending.exists():
+                if committed:
+                    os.replace(pending, self._column_path(column))
+                else:
+                    pending.unlink()
+        if committed:
+            os.replace(self._pending(self._index_path), self._index_path)
+
+    def migrate_json(self, stats_dir: str = None, remove: bool = True) -> int:
+        """Import legacy ``stats_*.json`` snapshots that are not in the store yet"""
+        stats_dir = Path(stats_dir or self.root)
+        known = set(self.timestamps())
+        migrated = 0
+        for stats_file in sorted(stats_dir.glob("stats_*.json")):
+            timestamp = stats_file.stem[len("stats_"):]
+            if timestamp not in known:
+                with open(stats_file, "r", encoding="utf-8") as f:
+                    self.append(timestamp, json.load(f))
+                known.add(timestamp)
+                migrated += 1
+            if remove:
+                stats_file.unlink()
+        return migrated
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the stats snapshot store")
+    parser.add_argument("command", choices=["migrate", "list", "compact"])
+    parser.add_argument("--stats-dir", default=DEFAULT_STATS_DIR)
+    parser.add_argument("--keep-json", action="store_true", help="Keep stats_*.json files after migrating them")
+    parser.add_argument("--full-days", type=int, default=RetentionPolicy.full_days,
+                        help="Days of snapshots kept at full resolution when compacting")
+    parser.add_argument("--daily-days", type=int, default=RetentionPolicy.daily_days,
+                        help="Days after that kept as daily rollups; older ones become weekly")
+    args = parser.parse_args()
+
+    store = SnapshotStore(args.stats_dir)
+    if args.command == "migrate":
+        count = store.migrate_json(remove=not args.keep_json)
+        print(f"Migrated {count} JSON snapshot(s) into {args.stats_dir}")
+    elif args.command == "compact":
+        removed = store.compact(RetentionPolicy(args.full_days, args.daily_days))
+        print(f"Compacted {args.stats_dir}: {removed} snapshot(s) rolled up, {len(store.timestamps())} left")
+        if removed:
+            # Imported here: visualizations imports this module
+            from src.visualizations import rebuild_aggregates
+            rebuild_aggregates(store)
+    else:
+        for timestamp in store.timestamps():
+            print(timestamp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+# Repository root, so src.* can be imported when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.github_api import GitHubAPI, trending_view
+from src.models import Repo
+
+# Kept with the other persisted run state, which CI restores between runs
+DEFAULT_INDEX_PATH = ".github/cache/star_index.bin"
+MAX_SAMPLES = 120                 # ~30 days of 6-hourly runs per repository
+MIN_SAMPLE_INTERVAL = 60 * 60     # a sample this close to the one before the latest replaces the latest
+EXPIRE_AFTER = 30 * 24 * 60 * 60  # repositories not seen for this long are dropped
+TRENDING_CANDIDATES = 100         # one search page of recent repos, ranked locally
+
+_MAGIC = b"STARIDX1"
+_HEADER = struct.Struct("<HH")  # name length, sample count
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def _epoch(created_at: str) -> Optional[float]:
+    try:
+        return datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+class StarIndex:
+    """Per-repository (timestamp, stars) samples, persisted as compact uint32 arrays.
+
+    Samples are appended once per run, so velocity and acceleration come from
+    the last two or three samples of one repository: O(1), with no scan of
+    the snapshot history.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH):
+        self.path = Path(path)
+        self.series: Dict[str, tuple] = {}  # full_name -> (array of epoch seconds, array of stars)
+        self._load()
+
+    def _load(self):
+        if not self.path.exists():
+            return
+        raw = self.path.read_bytes()
+        if not raw.startswith(_MAGIC):
+            print(f"Ignoring unreadable star index {self.path}", file=sys.stderr)
+            return
+        pos = len(_MAGIC)
+        while pos + _HEADER.size <= len(raw):
+            name_length, count = _HEADER.unpack_from(raw, pos)
+            pos += _HEADER.size
+            name = raw[pos:pos + name_length].decode("utf-8")
+            pos += name_length
+            times, stars = array("I"), array("I")
+            times.frombytes(raw[pos:pos + 4 * count])
+            stars.frombytes(raw[pos + 4 * count:pos + 8 * count])
+            pos += 8 * count
+            if sys.byteorder == "big":
+                times.byteswap()
+                stars.byteswap()
+            self.series[name] = (times, stars)
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            for name, (times, stars) in self.series.items():
+                encoded = name.encode("utf-8")
+                f.write(_HEADER.pack(len(encoded), len(times)))
+                f.write(encoded)
+                if sys.byteorder == "big":
+                    times, stars = array("I", times), array("I", stars)
+                    times.byteswap()
+                    stars.byteswap()
+                f.write(times.tobytes())
+                f.write(stars.tobytes())
+        os.replace(tmp_path, self.path)
+
+    def record(self, repos: Iterable[Repo], now: float = None):
+        """Add a stars sample for every repo, then drop repositories not seen recently"""
+        now = int(now if now is not None else time.time())
+        for repo in repos:
+            times, stars = self.series.setdefault(repo.full_name, (array("I"), array("I")))
+            # Compared with the sample before the latest, so at any cadence the latest
+            # keeps moving forward while the one before it stays put
+            if len(times) >= 2 and now - times[-2] < MIN_SAMPLE_INTERVAL:
+                times[-1], stars[-1] = now, repo.stargazers_count
+            else:
+                times.append(now)
+                stars.append(repo.stargazers_count)
+            if len(times) > MAX_SAMPLES:
+                del times[:-MAX_SAMPLES]
+                del stars[:-MAX_SAMPLES]
+        expired = [name for name, (times, _) in self.series.items() if now - times[-1] > EXPIRE_AFTER]
+        for name in expired:
+            del self.series[name]
+
+    def velocity(self, full_name: str) -> Optional[float]:
+        """Stars per day between the last two samples, or None with fewer than two"""
+        times, stars = self.series.get(full_name, ((), ()))
+        if len(times) < 2 or times[-1] == times[-2]:
+            return None
+        return (stars[-1] - stars[-2]) * SECONDS_PER_DAY / (times[-1] - times[-2])
+
+    def acceleration(self, full_name: str) -> Optional[float]:
+        """Change in velocity per day over the last three samples, or None with fewer than three"""
+        times, stars = self.series.get(full_name, ((), ()))
+        if len(times) < 3 or len({times[-1], times[-2], times[-3]}) < 3:
+            return None
+        latest = (stars[-1] - stars[-2]) * SECONDS_PER_DAY / (times[-1] - times[-2])
+        previous = (stars[-2] - stars[-3]) * SECONDS_PER_DAY / (times[-2] - times[-3])
+        return (latest - previous) * SECONDS_PER_DAY / (times[-1] - times[-2])
+
+    def growth_rate(self, repo: Repo, now: float = None) -> float:
+        """Measured velocity, or stars per day since creation for repos seen only once"""
+        velocity = self.velocity(repo.full_name)
+        if velocity is not None:
+            return velocity
+        created = _epoch(repo.created_at)
+        if created is None:
+            return 0.0
+        age_days = max(((now or time.time()) - created) / SECONDS_PER_DAY, 1.0)
+        return repo.stargazers_count / age_days
+
+    def rank(self, repos: List[Repo], now: float = None) -> List[Repo]:
+        """Repos with a measured velocity, ordered by it, then acceleration, then stars;
+        after them repos seen only once, ordered by stars per day since creation.
+
+        A lifetime average and a short-window velocity are not comparable, so
+        the two groups are ranked separately rather than in one order.
+        """
+        def key(repo):
+            velocity = self.velocity(repo.full_name)
+            if velocity is None:
+                return (False, self.growth_rate(repo, now), 0.0, repo.stargazers_count)
+            return (True, velocity, self.acceleration(repo.full_name) or 0.0, repo.stargazers_count)
+        return sorted(repos, key=key, reverse=True)
+
+    def rebuild(self, store) -> int:
+        """Refill the index from the trending column of a SnapshotStore; returns samples added"""
+        self.series = {}
+        added = 0
+        for row in store.read(["trending"]):
+            when = datetime.strptime(row["timestamp"], "%Y%m%d_%H%M").timestamp()
+            repos = [Repo.from_api(item) for item in (row["trending"] or {}).get("items", [])]
+            self.record(repos, now=when)
+            added += len(repos)
+        return added
+
+
+def get_trending_by_growth(api: GitHubAPI, limit: int, index: StarIndex = None) -> Dict:
+    """Recent repositories ranked by star growth, shaped like a search response.
+
+    Samples every candidate into the star index (and saves it), so the next
+    run can measure their velocity. With TRENDING_RANKING=stars the candidates
+    keep the plain most-starred order instead.
+    """
+    candidates = api.get_views(
+        [trending_view("trending", since="weekly", limit=max(limit, TRENDING_CANDIDATES))])["trending"]["items"]
+    if os.getenv("TRENDING_RANKING", "growth") == "stars":
+        items = candidates[:limit]
+    else:
+        index = index or StarIndex()
+        index.record(candidates)
+        index.save()
+        items = index.rank(candidates)[:limit]
+    return {"total_count": len(items), "items": items}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or rebuild the per-repo star index")
+    parser.add_argument("command", choices=["rebuild", "top"])
+    parser.add_argument("--index", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--stats-dir", default=".github/stats")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    index = StarIndex(args.index)
+    if args.command == "rebuild":
+        from src.snapshots import SnapshotStore
+        added = index.rebuild(SnapshotStore(args.stats_dir))
+        index.save()
+        print(f"Rebuilt {args.index} from {added} sample(s) across {len(index.series)} repositories")
+    else:
+        velocities = [(index.velocity(name), name) for name in index.series]
+        for velocity, name in sorted((v, n) for v, n in velocities if v is not None)[::-1][:args.limit]:
+            print(f"{name}: {velocity:+.1f} stars/day, acceleration {index.acceleration(name) or 0.0:+.1f}")
+
+
+if __name__ == "__main__":
+    main()
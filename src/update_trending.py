@@ -1,40 +1,61 @@
+import json
 import os
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime
 import pytz
 import sys
 
 # Adjust sys.path to find github_utils.py in .github/scripts
 # Assumes update_trending.py is in src/ and github_utils.py is in .github/scripts/
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '.github', 'scripts')))
+# Repository root, so the shared src.github_api client (and its response cache) can be imported
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from comment_outbox import CommentOutbox
 from github_utils import get_or_create_issue
-from github import Github # PyGithub
+from src.github_api import GitHubAPI
+from src.http_client import get_github
+from src.metrics import get_metrics, write_metrics
+from src.render import ensure_regions, render_regions, write_if_changed
+from src.star_index import get_trending_by_growth
 
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN') # This should already be set by the workflow
-HEADERS = {'Authorization': f'token {GITHUB_TOKEN}'} if GITHUB_TOKEN else {}
 
 # Constants for Trending Repos Log
 TRENDING_LOG_LABEL = "trending-repos"
 TRENDING_LOG_TITLE = "Trending Repositories"
+TRENDING_LIMIT = 10
+# Ranked list of the last comment posted, restored with the rest of .github/cache
+LAST_POSTED_PATH = '.github/cache/trending_last_posted.json'
 
-def get_trending_repos():
-    # Calculate date for repos created in the last week
-    week_ago = (datetime.now(pytz.UTC) - timedelta(days=7)).strftime('%Y-%m-%d')
-    
-    # GitHub Search API query
-    query = f'created:>{week_ago} sort:stars-desc'
-    url = f'https://api.github.com/search/repositories?q={query}&per_page=10'
-    
-    response = requests.get(url, headers=HEADERS)
-    return response.json()['items']
+def get_trending_repos(api=None):
+    # Same "created in the last week" candidate search that updates_stats.py issues (so a
+    # run shortly after it is answered from the shared response cache), ranked by star growth
+    api = api or GitHubAPI(GITHUB_TOKEN)
+    return get_trending_by_growth(api, TRENDING_LIMIT)["items"]
 
 def format_repo_entry(repo):
-    stars = repo['stargazers_count']
-    description = repo['description'] or 'No description provided'
-    return f"- [{repo['full_name']}]({repo['html_url']}): {description} ⭐{stars}"
+    # repo is a src.models.Repo record, as returned by GitHubAPI
+    description = repo.description or 'No description provided'
+    return f"- [{repo.full_name}]({repo.html_url}): {description} ⭐{repo.stargazers_count}"
 
-def update_public_repos_file():
-    trending_repos_list = get_trending_repos() # Renamed for clarity
+def _load_last_posted():
+    try:
+        with open(LAST_POSTED_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _save_last_posted(names):
+    os.makedirs(os.path.dirname(LAST_POSTED_PATH), exist_ok=True)
+    tmp_path = LAST_POSTED_PATH + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(names, f)
+    os.replace(tmp_path, LAST_POSTED_PATH)
+
+def update_public_repos_file(trending_repos_list=None):
+    metrics = get_metrics()
+    if trending_repos_list is None:
+        with metrics.stage('fetch'):
+            trending_repos_list = get_trending_repos() # Renamed for clarity
     
     # --- Post to GitHub Issue ---
     repo_name_env = os.getenv('GITHUB_REPOSITORY')
@@ -44,11 +65,17 @@ def update_public_repos_file():
         print("GITHUB_TOKEN not set. Skipping issue posting and MD update.", file=sys.stderr)
         return # Early exit if no token, as both issue posting and MD update might need it implicitly or explicitly
 
-    if repo_name_env:
+    # A comment is only posted when the ranked list differs from the last one posted,
+    # so frequent runs (e.g. the daemon's) do not flood the issue with repeats
+    ranked_names = [repo.full_name for repo in trending_repos_list or []]
+    if ranked_names and ranked_names == _load_last_posted():
+        print("Trending repositories unchanged since the last comment. Skipping issue posting.")
+    elif repo_name_env:
         try:
-            g = Github(GITHUB_TOKEN) # Initialize PyGithub client
+            g = get_github(GITHUB_TOKEN) # Shared PyGithub client
             trending_issue_number = get_or_create_issue(repo_name_env, TRENDING_LOG_LABEL, TRENDING_LOG_TITLE)
-            trending_issue_obj = g.get_repo(repo_name_env).get_issue(number=trending_issue_number)
+            trending_repo = g.get_repo(repo_name_env)
+            trending_issue_obj = trending_repo.get_issue(number=trending_issue_number)
             print(f"Fetched trending repos log issue #{trending_issue_obj.number}")
         except Exception as e:
             print(f"Error getting or creating trending repos log issue: {e}", file=sys.stderr)
@@ -62,11 +89,13 @@ def update_public_repos_file():
             comment_body_parts.append(format_repo_entry(repo_item)) # Use existing function
 
         final_comment = "\n".join(comment_body_parts)
-        try:
-            trending_issue_obj.create_comment(final_comment)
-            print(f"Posted trending repos to issue #{trending_issue_obj.number}")
-        except Exception as e:
-            print(f"Error posting trending repos to issue #{trending_issue_obj.number}: {e}", file=sys.stderr)
+        # Posted through the outbox, so a failed post is retried on the next run instead of lost
+        outbox = CommentOutbox(trending_repo)
+        outbox.add(trending_issue_obj, final_comment)
+        with metrics.stage('post_comments'):
+            outbox.flush()
+        # Recorded even if the post failed: the outbox replays it on a later run
+        _save_last_posted(ranked_names)
     elif not trending_repos_list:
         print("No trending repositories found to post to issue.", file=sys.stderr)
     # --- End of Post to GitHub Issue ---
@@ -78,44 +107,25 @@ def update_public_repos_file():
         # For now, if no repos, it will effectively clear the trending section in MD.
     
     try:
-        with open('PUBLIC_REPOS.md', 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        trending_section_header = '## Trending\n'
-        # Ensure trending_repos_list is used here as well
-        trending_entries = '\n'.join(format_repo_entry(repo) for repo in trending_repos_list)
-
-        parts = content.split('## Trending')
-        if len(parts) >= 2:
-            # This logic assumes the "## Trending" header exists and is followed by other "## " sections.
-            # It tries to preserve content after the trending list up to the next "## "
-            intro_part = parts[0]
-            # Content after "## Trending" header
-            after_trending_header_part = parts[1]
-
-            # Find where the old list of trending items ends (i.e., before the next "## " section or EOF)
-            next_section_marker_match = re.search(r"(\n##\s)", after_trending_header_part, re.MULTILINE)
-            if next_section_marker_match:
-                # There's another section after the trending list
-                following_content = after_trending_header_part[next_section_marker_match.start():]
-            else:
-                # Trending list is the last major section, or only section.
-                following_content = "" # No other major sections after it.
-
-            new_content = intro_part + trending_section_header + trending_entries + following_content
+        with metrics.stage('render'):
+            with open('PUBLIC_REPOS.md', 'r', encoding='utf-8') as f:
+                content = f.read()
+
+            trending_entries = '\n'.join(format_repo_entry(repo) for repo in trending_repos_list)
+            content = ensure_regions(content, {'trending': '## Trending'})
+            content = render_regions(content, {'trending': trending_entries})
+            changed = write_if_changed('PUBLIC_REPOS.md', content)
+
+        if changed:
+            print("Updated PUBLIC_REPOS.md with new trending repositories.")
         else:
-            # "## Trending" section not found, append it. This might be too simple.
-            # A better approach might be to ensure a placeholder exists or use a more robust template.
-            print("'## Trending' section not found in PUBLIC_REPOS.md. Appending new section.", file=sys.stderr)
-            new_content = content.rstrip('\n') + '\n\n' + trending_section_header + trending_entries + '\n'
-
-        with open('PUBLIC_REPOS.md', 'w', encoding='utf-8') as f:
-            f.write(new_content)
-        print("Updated PUBLIC_REPOS.md with new trending repositories.")
+            print("PUBLIC_REPOS.md is already up to date.")
     except Exception as e:
         print(f"Error updating PUBLIC_REPOS.md: {e}", file=sys.stderr)
 
 
 if __name__ == '__main__':
-    update_public_repos_file()
-# Ensure re is imported at the top if used.
+    try:
+        update_public_repos_file()
+    finally:
+        write_metrics('update_trending')
@@ -1,60 +1,194 @@
-import plotly.graph_objects as go
-import plotly.express as px
+# Ensure re is imported at the top if used.
 import pandas as pd
 from pathlib import Path
-import json
-
-def create_language_trend_viz():
-    """Create visualization for programming language trends"""
-    stats_dir = Path('.github/stats')
-    dfs = []
-    
-    for stats_file in sorted(stats_dir.glob('stats_*.json')):
-        with open(stats_file, 'r') as f:
-            data = json.load(f)
-            lang_data = data['languages']
-            df = pd.DataFrame.from_dict(lang_data, orient='index')
-            df['date'] = data['timestamp']
-            dfs.append(df)
-    
-    if dfs:
-        df_combined = pd.concat(dfs)
-        fig = px.line(df_combined, 
-                     x='date', 
-                     y='stars', 
-                     color=df_combined.index,
-                     title='Programming Language Popularity Trends')
-        fig.write_html('docs/visualizations/language_trends.html')
-
-def create_topic_popularity_viz(latest_stats_file):
-    """Create visualization for topic popularity"""
-    with open(latest_stats_file, 'r') as f:
-        data = json.load(f)
-    
-    topics = data['topics']
-    topic_names = list(topics.keys())
-    repo_counts = [topic['total_count'] for topic in topics.values()]
-    
-    fig = go.Figure(data=[
-        go.Bar(x=topic_names, y=repo_counts)
-    ])
-    fig.update_layout(
-        title='Popular Topics on GitHub',
-        xaxis_title='Topics',
-        yaxis_title='Number of Repositories'
-    )
-    fig.write_html('docs/visualizations/topic_popularity.html')
-
-def main():
+import argparse
+import csv
+import os
+import re
+import sys
+
+# Repository root, so src.snapshots can be imported when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from src.charts import render_charts
+from src.downsample import DEFAULT_POINT_BUDGET
+from src.metrics import get_metrics, write_metrics
+from src.series_table import write_series_table
+from src.snapshots import SnapshotStore
+
+OUTPUT_DIR = 'docs/visualizations'
+LANGUAGE_AGGREGATE_FILE = 'language_trends.csv'
+LANGUAGE_AGGREGATE_MARK = 'language_trends.mark'
+TOPIC_AGGREGATE_FILE = 'topic_trends.csv'
+TOPIC_AGGREGATE_MARK = 'topic_trends.mark'
+SERIES_TABLE_FILE = 'chart_series.npy'
+REPO_CHART_LIMIT = 20
+
+def _language_rows(languages):
+    for lang, stats in (languages or {}).items():
+        yield lang, stats['count'], stats['stars']
+
+def _topic_rows(topics):
+    for topic, stats in (topics or {}).items():
+        yield topic, stats['total_count']
+
+# Snapshot column -> (aggregate file, high-water mark file, CSV columns, row extractor)
+AGGREGATES = {
+    'languages': (LANGUAGE_AGGREGATE_FILE, LANGUAGE_AGGREGATE_MARK,
+                  ['date', 'language', 'count', 'stars'], _language_rows),
+    'topics': (TOPIC_AGGREGATE_FILE, TOPIC_AGGREGATE_MARK,
+               ['date', 'topic', 'total_count'], _topic_rows),
+}
+
+def update_aggregate(store, column, rebuild=False):
+    """Fold snapshots appended after the high-water mark into the aggregate table of ``column``
+
+    The mark is a position in the store's append order, not a timestamp, so a
+    snapshot replacing one with the same timestamp is folded in too.
+    """
+    aggregate_file, mark_file, header, extract = AGGREGATES[column]
+    aggregate_path = store.root / aggregate_file
+    mark_path = store.root / mark_file
+    mark = mark_path.read_text().strip() if mark_path.exists() else ''
+    position = int(mark) if mark.isdigit() else 0
+    # A mark from before positions (a timestamp) or past the end of a compacted index is unusable
+    snapshots, end = store.read_appended([column], position)
+    if rebuild or (mark and not mark.isdigit()) or position > end:
+        aggregate_path.unlink(missing_ok=True)
+        snapshots, end = store.read_appended([column])
+
+    rows = []
+    for snapshot in snapshots:
+        rows.extend((snapshot['timestamp'],) + row for row in extract(snapshot[column]))
+
+    if rows:
+        write_header = not aggregate_path.exists()
+        with open(aggregate_path, 'a', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            if write_header:
+                writer.writerow(header)
+            writer.writerows(rows)
+    # The mark is written after the rows, so a crash in between can only duplicate
+    # rows, which load_aggregate drops (keeping the last, i.e. the replacing, copy)
+    mark_path.write_text(str(end))
+
+def rebuild_aggregates(store):
+    """Refold every aggregate from the store, e.g. once compaction has rolled its snapshots up"""
+    for column in AGGREGATES:
+        update_aggregate(store, column, rebuild=True)
+
+def load_aggregate(store, column):
+    aggregate_file, _, header, _ = AGGREGATES[column]
+    aggregate_path = store.root / aggregate_file
+    if not aggregate_path.exists():
+        return pd.DataFrame(columns=header)
+    df = pd.read_csv(aggregate_path, dtype={'date': str})
+    df = df.drop_duplicates(header[:2], keep='last')
+    return df.assign(date=pd.to_datetime(df['date'], format='%Y%m%d_%H%M'))
+
+def slugify(name):
+    name = name.lower().replace('+', 'plus').replace('#', 'sharp')  # keeps C, C++ and C# apart
+    return re.sub(r'[^a-z0-9._-]+', '-', name).strip('-') or 'unnamed'
+
+def _group_series(df, key, value, prefix):
+    return {f'{prefix}/{name}': group.set_index('date')[value].astype(float)
+            for name, group in df.groupby(key)}
+
+def collect_repo_series(store, limit=REPO_CHART_LIMIT):
+    """Stars history from the star index for the repos in the latest trending snapshot"""
+    from src.star_index import StarIndex  # only needed when there is trending data to chart
+    latest = store.latest(['trending'])
+    if not latest or not latest['trending']:
+        return {}
+    index = StarIndex()
+    series = {}
+    for item in latest['trending'].get('items', [])[:limit]:
+        times, stars = index.series.get(item['full_name'], ((), ()))
+        if len(times) >= 2:
+            series[f"repo/{item['full_name']}"] = pd.Series(
+                list(stars), index=pd.to_datetime(list(times), unit='s'), dtype=float)
+    return series
+
+def create_language_trend_viz(ranges):
+    """Chart specs for the combined language trend and one chart per language"""
+    languages = sorted(name.split('/', 1)[1] for name in ranges if name.startswith('language/'))
+    if not languages:
+        return []
+    specs = [{'path': 'language_trends.html', 'kind': 'line',
+              'title': 'Programming Language Popularity Trends', 'y_title': 'Stars',
+              'series': [(lang, *ranges[f'language/{lang}']) for lang in languages]}]
+    for lang in languages:
+        specs.append({'path': f'languages/{slugify(lang)}.html', 'kind': 'line',
+                      'title': f'{lang} Popularity Trend', 'y_title': 'Stars',
+                      'series': [(lang, *ranges[f'language/{lang}'])]})
+    return specs
+
+def create_topic_popularity_viz(latest_snapshot, ranges):
+    """Chart specs for topic popularity and one trend chart per topic"""
+    specs = []
+    if latest_snapshot:
+        topics = latest_snapshot['topics']
+        specs.append({'path': 'topic_popularity.html', 'kind': 'bar',
+                      'title': 'Popular Topics on GitHub', 'x_title': 'Topics',
+                      'y_title': 'Number of Repositories',
+                      'x': list(topics.keys()), 'y': [topic['total_count'] for topic in topics.values()]})
+    for name in sorted(ranges):
+        if name.startswith('topic/'):
+            topic = name.split('/', 1)[1]
+            specs.append({'path': f'topics/{slugify(topic)}.html', 'kind': 'line',
+                          'title': f'Repositories tagged {topic}', 'y_title': 'Number of Repositories',
+                          'series': [(topic, *ranges[name])]})
+    return specs
+
+def create_repo_trend_viz(ranges):
+    """One stars chart per trending repository with at least two star index samples"""
+    specs = []
+    for name in sorted(ranges):
+        if name.startswith('repo/'):
+            full_name = name.split('/', 1)[1]
+            specs.append({'path': f"repos/{slugify(full_name.replace('/', '__'))}.html", 'kind': 'line',
+                          'title': f'{full_name} Stars', 'y_title': 'Stars',
+                          'series': [(full_name, *ranges[name])]})
+    return specs
+
+def main(rebuild=False, points=DEFAULT_POINT_BUDGET, workers=None):
     # Create visualizations directory if it doesn't exist
-    Path('docs/visualizations').mkdir(parents=True, exist_ok=True)
-    
-    # Generate visualizations
-    create_language_trend_viz()
-    
-    # Get latest stats file
-    latest_stats = sorted(Path('.github/stats').glob('stats_*.json'))[-1]
-    create_topic_popularity_viz(latest_stats)
+    Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+
+    # Fold any legacy stats_*.json files into the snapshot store first. They may
+    # predate the aggregates' high-water marks, so rebuild them when any arrive.
+    metrics = get_metrics()
+    store = SnapshotStore('.github/stats')
+    with metrics.stage('migrate'):
+        if store.migrate_json():
+            rebuild = True
+
+    with metrics.stage('viz'):
+        # Every series any chart draws goes into one table, which the render
+        # workers memory-map instead of each receiving its own copy
+        for column in AGGREGATES:
+            update_aggregate(store, column, rebuild=rebuild)
+        series = _group_series(load_aggregate(store, 'languages'), 'language', 'stars', 'language')
+        series.update(_group_series(load_aggregate(store, 'topics'), 'topic', 'total_count', 'topic'))
+        series.update(collect_repo_series(store))
+        table_path = store.root / SERIES_TABLE_FILE
+        ranges = write_series_table(table_path, series)
+
+        specs = create_language_trend_viz(ranges)
+        specs += create_topic_popularity_viz(store.latest(['topics']), ranges)
+        specs += create_repo_trend_viz(ranges)
+        counts = render_charts(specs, table_path, OUTPUT_DIR, points=points, workers=workers)
+        print(f"Charts: {counts['rendered']} rendered, {counts['unchanged']} unchanged, {counts['failed']} failed")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Generate the stats visualizations")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild the trend aggregates from the full snapshot history")
+    parser.add_argument('--points', type=int, default=DEFAULT_POINT_BUDGET,
+                        help="Maximum points drawn per series in the trend charts")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Chart rendering processes (default: one per CPU)")
+    args = parser.parse_args()
+    try:
+        main(rebuild=args.rebuild, points=args.points, workers=args.workers)
+    finally:
+        write_metrics('visualizations')